@@ -29,6 +29,11 @@ _DEFAULTS = {
     "export": {
         "point_style": "dot",
         "hiddenlines_style": "normal",
+        "curves": "native",
+        "curve_tolerance": "0.01",
+    },
+    "view": {
+        "canvas": "raster",
     },
 }
 
@@ -1,11 +1,16 @@
+import bisect
+import csv
 import math
-from typing import override
+import time
+from collections import deque
+from typing import Callable, override
 
-from PyQt6.QtCore import QPointF, Qt, pyqtSignal
-from PyQt6.QtGui import QColor, QPainter, QPen, QWheelEvent
-from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import QLine, QPointF, QRectF, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPainter, QPainterPath, QPen, QPolygonF, QTransform, QWheelEvent
+from PyQt6.QtWidgets import QApplication, QWidget
 
-from geometry_math import Circle, Ellipse, Line, Point
+from geometry_math import Line, Point, Polyline, Shape
+from render_geometry import MM_PER_UNIT, distance_to, record_of
 
 style = {"normal": 0.2, "bold": 0.6}
 type = {
@@ -16,12 +21,50 @@ type = {
 }
 
 
-class DrawingCanvas(QWidget):
-    selection_changed = pyqtSignal(list)
-    resize_confirmed = pyqtSignal(str, float, float)
+HOVER_COLOR = QColor(255, 165, 0)
+LINE_COLOR = QColor(0, 0, 0)
+POINT_COLOR = QColor(0, 0, 255)
+AXIS_COLORS = {"org_x": QColor(200, 50, 50), "org_y": QColor(0, 165, 255)}
 
-    def __init__(self, objects, settings=None):
-        super().__init__()
+
+# Mouse and wheel input is coalesced to at most one frame per this many
+# milliseconds (~60 fps): pan and zoom steps are applied together, hover is
+# computed once for the latest cursor position and a point drag re-evaluates
+# once, then the canvas repaints.
+FRAME_MS = 16
+# How many recent frames frame_stats() and the histogram cover
+FRAME_HISTORY = 600
+# Bucket edges (ms) of the frame time histogram (export_frame_histogram)
+HISTOGRAM_EDGES_MS = (0, 1, 2, 4, 8, 16, 33, 50, 100, 200, 500)
+# Labels of points this far outside the painted area (px) may still show
+LABEL_MARGIN_PX = 200
+
+
+def dash_unit(pen: QPen, to_device: float) -> float:
+    """Sheet pixels per unit of pen's dash pattern: its width, or a device
+    pixel for pens at most that wide, which Qt strokes as cosmetic"""
+    return max(pen.widthF() * to_device, 1.0) / to_device
+
+
+class CanvasBase:
+    """What the raster canvas (DrawingCanvas) and the OpenGL one
+    (gl_canvas.GLDrawingCanvas) share: panning, zooming, hover, selection,
+    point drags, resize mode, pens, and the parts of a frame drawn with
+    QPainter (sheet, point labels, tooltip, resize preview).
+
+    Subclasses are QWidgets that declare the signals below, call
+    setup_canvas() from __init__ and draw the objects themselves:
+
+        selection_changed(list)
+        resize_confirmed(str, float, float)
+        # Point drag: started(key), moved(key, logical x, logical y), finished(key).
+        # A drag_started receiver that cannot move the point calls cancel_drag().
+        drag_started(str)
+        point_dragged(str, float, float)
+        drag_finished(str)
+    """
+
+    def setup_canvas(self, objects, settings=None):
         self.settings = settings if settings is not None else {}
         self.setMinimumSize(400, 300)
         self.zoom = 0.2
@@ -35,7 +78,7 @@ class DrawingCanvas(QWidget):
         self.paper_h = self.a4_h_mm * self.mm_to_px
         self.padding = 10 * self.mm_to_px
 
-        self.scale = 10
+        self.scale = MM_PER_UNIT  # paper mm per logical unit
         self.hit_threshold = 0.05
         self.sensitivity = 1
         self.zoom_in_factor = 1.1
@@ -53,7 +96,48 @@ class DrawingCanvas(QWidget):
         self.resize_preview = (0.0, 1.0)  # (r1, r2) t-parameters
         self.resize_side = 'end'           # which endpoint is being dragged
 
-    @override
+        # Point drag state. A drag starts once the mouse has moved the
+        # platform's drag distance from drag_press_pos; the point keeps the
+        # offset drag_grab (logical units) it had from the cursor then.
+        self.drag_key = None
+        self.dragging = False
+        self.pending_drag_pos = None
+        self.drag_press_pos = QPointF()
+        self.drag_grab = QPointF()
+
+        # Input waiting for the next frame tick (see flush_frame)
+        self.pending_pan = QPointF(0.0, 0.0)
+        self.pending_zoom: list[tuple[float, QPointF]] = []  # (factor, mouse position)
+        self.pending_hover_pos: QPointF | None = None
+        self.pending_repaint = False
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setInterval(FRAME_MS)
+        self.frame_timer.timeout.connect(self.flush_frame)
+        # Seconds spent per tick (input), per paint and per hover search,
+        # most recent last
+        self.tick_times: deque[float] = deque(maxlen=FRAME_HISTORY)
+        self.paint_times: deque[float] = deque(maxlen=FRAME_HISTORY)
+        self.hover_times: deque[float] = deque(maxlen=FRAME_HISTORY)
+
+        # Debug overlay (see draw_debug_overlay)
+        self.debug_overlay = False
+        # Returns the project's last edit evaluation time in seconds, or None
+        self.eval_time_source: Callable[[], float | None] | None = None
+        self.labels_drawn = 0
+        self.labels_culled = 0
+
+        # Pens are built once per (pen key, hovered) and reused every frame;
+        # they depend on mm_to_px, so the pool is dropped when that changes.
+        self.pen_pool: dict[tuple, QPen] = {}
+        self.pen_pool_scale = None
+        self.label_font: QFont | None = None
+        # Drawing data of the subclass, valid while batch_key == scene_key().
+        # Hovering and selecting leave it alone: highlighted objects are
+        # drawn again on top of it (see highlighted).
+        self.batch_key = None
+        self.label_batch: list[tuple[QPointF, str, str]] = []
+
     def wheelEvent(self, a0: QWheelEvent | None):
         if a0 is None:
             return
@@ -66,17 +150,83 @@ class DrawingCanvas(QWidget):
         # A standard mouse wheel step is 120. For touchpads, the delta is smaller but more frequent.
         # Scale the zoom factor proportionally to the delta for smooth zooming on all devices.
         factor = (self.zoom_in_factor) ** (delta / 120.0)
-        center = QPointF(self.width() / 2, self.height() / 2)
-        relative_pos = mouse_pos - (center + self.offset)
-        self.offset -= relative_pos * (factor - 1)
-        self.zoom *= factor
-        self.update()
+        self.pending_zoom.append((factor, mouse_pos))
+        self.pending_hover_pos = mouse_pos
+        self.schedule_frame()
         a0.accept()
 
-    @override
+    def schedule_frame(self):
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def flush_frame(self):
+        """Apply the input gathered since the last tick - pan, zoom, point
+        drag, hover - and repaint once if anything visible changed."""
+        self.frame_timer.stop()
+        started = time.perf_counter()
+        repaint = self.pending_repaint
+        self.pending_repaint = False
+        if self.pending_zoom or not self.pending_pan.isNull():
+            repaint = True
+            self.offset += self.pending_pan
+            self.pending_pan = QPointF(0.0, 0.0)
+            center = QPointF(self.width() / 2, self.height() / 2)
+            for factor, mouse_pos in self.pending_zoom:
+                relative_pos = mouse_pos - (center + self.offset)
+                self.offset -= relative_pos * (factor - 1)
+                self.zoom *= factor
+            self.pending_zoom.clear()
+        self.flush_drag()
+        if self.pending_hover_pos is not None:
+            logical_pos = self.map_to_logical(self.pending_hover_pos)
+            self.pending_hover_pos = None
+            hover_started = time.perf_counter()
+            self.check_mouse_hover(logical_pos.x(), logical_pos.y())
+            self.hover_times.append(time.perf_counter() - hover_started)
+        if repaint:
+            self.update()
+        self.tick_times.append(time.perf_counter() - started)
+
+    def record_paint(self, started: float):
+        """Subclasses call this at the end of painting, with perf_counter() from its start"""
+        self.paint_times.append(time.perf_counter() - started)
+
+    def frame_stats(self) -> dict[str, float]:
+        """Mean and worst tick, paint and hover times of the recent frames, in ms"""
+        stats = {}
+        for name, times in self.timings():
+            stats[f"{name}_mean_ms"] = 1000 * sum(times) / len(times) if times else 0.0
+            stats[f"{name}_max_ms"] = 1000 * max(times, default=0.0)
+        return stats
+
+    def timings(self) -> tuple[tuple[str, deque[float]], ...]:
+        return (("tick", self.tick_times), ("paint", self.paint_times), ("hover", self.hover_times))
+
+    def frame_histogram(self) -> list[tuple[float, float, dict[str, int]]]:
+        """(from ms, to ms, {timing: count}) over the recent frames"""
+        edges = [*HISTOGRAM_EDGES_MS, math.inf]
+        rows = [(lo, hi, {name: 0 for name, _ in self.timings()}) for lo, hi in zip(edges, edges[1:])]
+        for name, times in self.timings():
+            for seconds in times:
+                index = bisect.bisect_right(HISTOGRAM_EDGES_MS, 1000 * seconds) - 1
+                rows[index][2][name] += 1
+        return rows
+
+    def export_frame_histogram(self, filename: str):
+        """Write frame_histogram() as CSV: from_ms, to_ms and one count column per timing"""
+        names = [name for name, _ in self.timings()]
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["from_ms", "to_ms", *names])
+            for lo, hi, counts in self.frame_histogram():
+                writer.writerow([lo, "" if hi == math.inf else hi, *(counts[name] for name in names)])
+
     def mousePressEvent(self, a0):
         if a0 is None:
             return
+        # Act on what is under the cursor now, not at the last tick
+        if self.frame_timer.isActive():
+            self.flush_frame()
         # In resize mode, left click confirms the new resize
         if self.resize_mode and a0.button() == Qt.MouseButton.LeftButton:
             if self.resize_line_key:
@@ -96,12 +246,46 @@ class DrawingCanvas(QWidget):
                 else:
                     self.selected_objs.clear()
                     self.selected_objs.append(self.hovered_obj)
+                point = self.objects.get(self.hovered_obj)
+                if isinstance(point, Point):
+                    self.drag_key = self.hovered_obj
+                    self.drag_press_pos = a0.position()
+                    record = record_of(point)
+                    if record is not None:
+                        pressed = self.map_to_logical(a0.position())
+                        self.drag_grab = QPointF(record.geometry.x - pressed.x(), record.geometry.y - pressed.y())
             else:
                 self.selected_objs.clear()
         self.selection_changed.emit(self.selected_objs)
         self.update()
         a0.accept()
-    @override
+
+    def mouseReleaseEvent(self, a0):
+        if a0 is None:
+            return
+        if a0.button() == Qt.MouseButton.LeftButton and self.drag_key is not None:
+            key = self.drag_key
+            was_dragging = self.dragging
+            self.flush_drag()
+            self.cancel_drag()
+            if was_dragging:
+                self.drag_finished.emit(key)
+        a0.accept()
+
+    def flush_drag(self):
+        """Send the latest mouse position of a drag and repaint."""
+        if self.dragging and self.pending_drag_pos is not None:
+            pos = self.pending_drag_pos
+            self.pending_drag_pos = None
+            self.point_dragged.emit(self.drag_key, pos.x(), pos.y())
+            self.update()
+
+    def cancel_drag(self):
+        self.drag_key = None
+        self.dragging = False
+        self.pending_drag_pos = None
+        self.drag_grab = QPointF()
+
     def mouseDoubleClickEvent(self, a0):
         if a0 is None:
             return
@@ -111,7 +295,6 @@ class DrawingCanvas(QWidget):
                 print(f"Double-clicked on object key: {self.hovered_obj}")
         a0.accept()
 
-    @override
     def mouseMoveEvent(self, a0):
         if a0 is None:
             return
@@ -119,9 +302,23 @@ class DrawingCanvas(QWidget):
         if a0.buttons() & Qt.MouseButton.MiddleButton:
             current_pos = a0.position()
             delta = current_pos - self.last_mouse_pos
-            self.offset += delta * self.sensitivity
+            self.pending_pan += delta * self.sensitivity
             self.last_mouse_pos = current_pos
-            self.update()
+            self.schedule_frame()
+            a0.accept()
+            return
+
+        if self.drag_key is not None and a0.buttons() & Qt.MouseButton.LeftButton:
+            if not self.dragging:
+                # A click that wobbles a little only selects
+                moved = (a0.position() - self.drag_press_pos).manhattanLength()
+                if moved < QApplication.startDragDistance():
+                    a0.accept()
+                    return
+                self.dragging = True
+                self.drag_started.emit(self.drag_key)
+            self.pending_drag_pos = self.map_to_logical(a0.position()) + self.drag_grab
+            self.schedule_frame()
             a0.accept()
             return
 
@@ -142,63 +339,27 @@ class DrawingCanvas(QWidget):
                     else:
                         r1 = round(t, 4)
                     self.resize_preview = (r1, r2)
-                self.update()
+                self.pending_repaint = True
+                self.schedule_frame()
             return
 
-        logical_pos = self.map_to_logical(a0.position())
-        self.check_mouse_hover(logical_pos.x(), logical_pos.y())
+        self.pending_hover_pos = a0.position()
+        self.schedule_frame()
 
     def check_mouse_hover(self, px, py):
         best_match = None
         best_dist = float("inf")
         hit_threshold = self.hit_threshold * self.mm_to_px / (self.scale * self.zoom)
-        for key, obj in self.objects.items():
-            # Skip invisible objects from hover detection (but never skip axes)
-            if (hasattr(obj, 'type') and obj.type == 'none' or getattr(obj, 'hidden', False)) and getattr(obj, 'name', '') not in ('org_x', 'org_y'):
+        # Points are picked from a little farther away (see below)
+        reach = hit_threshold + self.hit_threshold
+        # Invisible objects are skipped from hover detection (but never axes)
+        for key, obj, record in self.visible_objects():
+            min_x, min_y, max_x, max_y = record.bbox
+            if px < min_x - reach or px > max_x + reach or py < min_y - reach or py > max_y + reach:
                 continue
-            dist = float("inf")
+            dist = distance_to(record.geometry, px, py, hit_threshold)
             if isinstance(obj, Point):
-                dist = (
-                    math.hypot(px - obj.x, py - obj.y) - self.hit_threshold
-                )  # Adjusted becose point harder to hit
-            elif isinstance(obj, Line):
-                dist = self.dist_point_to_line(
-                    px, py, obj.p1.x, obj.p1.y, obj.p2.x, obj.p2.y
-                )
-            elif isinstance(obj, Circle):
-                dist_to_center = math.hypot(px - obj.center.x, py - obj.center.y)
-                dist_to_edge = abs(dist_to_center - obj.radius)
-                if dist_to_edge <= hit_threshold:
-                    mouse_angle = math.degrees(
-                        math.atan2(py - obj.center.y, px - obj.center.x)
-                    )
-                    if obj.draw_from and obj.draw_span:
-                        mouse_angle %= 360
-                        start = obj.draw_from % 360
-                        diff = (mouse_angle - start) % 360
-
-                        if diff <= obj.draw_span:
-                            dist = dist_to_edge
-                        else:
-                            dist = float("inf")
-                    else:
-                        dist = dist_to_edge
-            elif isinstance(obj, Ellipse):
-                # Transform mouse point to ellipse local coordinates (unrotated)
-                dx = px - obj.center.x
-                dy = py - obj.center.y
-                cos_a = math.cos(-obj.angle)
-                sin_a = math.sin(-obj.angle)
-                lx = dx * cos_a - dy * sin_a
-                ly = dx * sin_a + dy * cos_a
-                
-                # Simple approximation: normalized distance to edge
-                if obj.a > 0 and obj.b > 0:
-                    norm_dist = math.sqrt((lx / obj.a)**2 + (ly / obj.b)**2)
-                    # Scale normalized distance back to coordinate units
-                    dist = abs(norm_dist - 1.0) * ((obj.a + obj.b) / 2.0)
-                else:
-                    dist = float("inf")
+                dist -= self.hit_threshold  # Adjusted becose point harder to hit
 
             if dist <= hit_threshold and dist < best_dist:
                 best_match = key
@@ -207,11 +368,9 @@ class DrawingCanvas(QWidget):
             self.hovered_obj = best_match
             self.update()
 
-    @override
-    def paintEvent(self, a0):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
+    def draw_sheet(self, painter: QPainter):
+        """Workspace and paper; leaves the painter in sheet pixels, with the
+        drawing origin at (0, 0) and y down."""
         # Fill the "Workspace" background
         painter.fillRect(self.rect(), QColor(50, 50, 50))
 
@@ -247,38 +406,124 @@ class DrawingCanvas(QWidget):
         off_y = self.settings.get('offset_y', 0.0) * self.scale * self.mm_to_px
         painter.translate(off_x, -off_y) # Y is inverted in our coordinate system
 
-        # Draw all objects
-        self.draw_objects(painter)
+    def pen_for(self, pen_key: tuple, is_hovered: bool) -> QPen:
+        if self.pen_pool_scale != self.mm_to_px:
+            self.pen_pool.clear()
+            self.pen_pool_scale = self.mm_to_px
+        pen = self.pen_pool.get((pen_key, is_hovered))
+        if pen is None:
+            pen = self.make_pen(pen_key, is_hovered)
+            self.pen_pool[(pen_key, is_hovered)] = pen
+        return pen
+
+    def highlight_pen(self, pen_key: tuple, to_device: float) -> QPen:
+        """The hover pen of pen_key, dashed to cover the dashes of the plain
+        pen drawn beneath it at this scale (device pixels per sheet pixel)"""
+        pen = self.pen_for(pen_key, True)
+        if pen.style() in (Qt.PenStyle.SolidLine, Qt.PenStyle.NoPen):
+            return pen
+        plain = self.pen_for(pen_key, False)
+        plain_unit = dash_unit(plain, to_device)
+        unit = dash_unit(pen, to_device)
+        if plain_unit == unit:
+            return pen  # both cosmetic, dashed alike
+        # Flat dashes as long as the plain ones with their round caps
+        cap = plain.widthF() / 2 if plain_unit > 1 / to_device else 0.0
+        pattern = []
+        for i, length in enumerate(plain.dashPattern()):
+            length = length * plain_unit + (2 * cap if i % 2 == 0 else -2 * cap)
+            pattern.append(max(length, 1e-3 * plain_unit) / unit)
+        pen = QPen(pen)
+        pen.setDashPattern(pattern)
+        pen.setDashOffset(cap / unit)
+        pen.setCapStyle(Qt.PenCapStyle.FlatCap)
+        return pen
+
+    def make_pen(self, pen_key: tuple, is_hovered: bool) -> QPen:
+        kind, style_name, type_name = pen_key
+        if kind == "axis":
+            # style_name is the axis name here
+            color = HOVER_COLOR if is_hovered else AXIS_COLORS[style_name]
+            thickness = 0.5 if is_hovered else 0.3
+        elif kind == "Point":
+            color = HOVER_COLOR if is_hovered else POINT_COLOR
+            thickness = 0.8 if is_hovered else 0.5
+        else:
+            color = HOVER_COLOR if is_hovered else LINE_COLOR
+            thickness = style[style_name] + 0.2 if is_hovered else style[style_name]
+        pen = QPen(color, thickness * self.mm_to_px)
+        if kind not in ("axis", "Point"):
+            pen.setStyle(type[type_name])
+        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        return pen
 
-    def draw_objects(self, painter: QPainter):
-        hovered_obj_data = None
-        
-        # First pass: Lines and Circles
-        for key, obj in self.objects.items():
+    def draw_labels(self, painter: QPainter, labels: list[tuple[QPointF, str, str]], highlighted=()):
+        """Draw point names (position, name, object key) in device pixels,
+        next to where the current transform puts their points; those of the
+        highlighted keys in the hover colour"""
+        if not labels:
+            return
+        if self.label_font is None:
+            self.label_font = QFont(painter.font())
+            self.label_font.setPointSize(10)
+        to_device = painter.transform()
+        device = painter.device()
+        # Labels far outside what is painted (the widget, or an export strip) are skipped
+        min_x = min_y = -LABEL_MARGIN_PX
+        max_x = device.width() + LABEL_MARGIN_PX
+        max_y = device.height() + LABEL_MARGIN_PX
+        painter.save()
+        painter.setWorldTransform(QTransform())
+        painter.setFont(self.label_font)
+        offset = QPointF(6, -6)
+        drawn = 0
+        for is_hovered in (False, True):
+            painter.setPen(HOVER_COLOR if is_hovered else POINT_COLOR)
+            for pt, name, key in labels:
+                if (key in highlighted) == is_hovered:
+                    at = to_device.map(pt)
+                    if min_x <= at.x() <= max_x and min_y <= at.y() <= max_y:
+                        painter.drawText(at + offset, name)
+                        drawn += 1
+        painter.restore()
+        self.labels_drawn = drawn
+        self.labels_culled = len(labels) - drawn
+
+    def scene_key(self) -> tuple:
+        """Changes whenever the batches built by build_batches are stale"""
+        return (Shape.scene_rev, id(self.objects), len(self.objects), self.mm_to_px)
+
+    def highlighted(self) -> list:
+        """Keys of the selected objects and the hovered one, drawn over the
+        batches with the hover pens"""
+        keys = dict.fromkeys(self.selected_objs)
+        if self.hovered_obj is not None:
+            keys[self.hovered_obj] = None
+        return list(keys)
+
+    def visible_objects(self, keys=None):
+        """(key, object, render record) of everything drawn, or of the
+        given keys only"""
+        if keys is None:
+            items = self.objects.items()
+        else:
+            items = ((key, self.objects[key]) for key in keys if key in self.objects)
+        for key, obj in items:
             if (hasattr(obj, 'type') and obj.type == 'none' or getattr(obj, 'hidden', False)) and getattr(obj, 'name', '') not in ('org_x', 'org_y'):
                 continue
-            is_selected = key == self.hovered_obj or key in self.selected_objs
-            if key == self.hovered_obj:
-                hovered_obj_data = obj
-
-            if isinstance(obj, Line):
-                if obj.name in ("org_x", "org_y"):
-                    self.draw_axis(painter, obj, is_selected)
-                else:
-                    self.draw_line(painter, obj, is_selected)
-            elif isinstance(obj, Circle):
-                self.draw_circle(painter, obj, is_selected)
-            elif isinstance(obj, Ellipse):
-                self.draw_ellipse(painter, obj, is_selected)
-
-        # Second pass: Points on top
-        for key, obj in self.objects.items():
-            if (hasattr(obj, 'type') and obj.type == 'none' or getattr(obj, 'hidden', False)) and getattr(obj, 'name', '') not in ('org_x', 'org_y'):
+            record = record_of(obj)
+            if record is None:
                 continue
-            is_selected = key == self.hovered_obj or key in self.selected_objs
-            if isinstance(obj, Point):
-                self.draw_point(painter, obj, is_selected)
+            yield key, obj, record
 
+    def draw_overlays(self, painter: QPainter):
+        """Point labels, the hover tooltip, the resize preview and the debug
+        overlay, drawn over the objects with the painter in sheet pixels"""
+        self.draw_labels(painter, self.label_batch, set(self.highlighted()))
+        if self.debug_overlay:
+            self.draw_debug_overlay(painter)
+
+        hovered_obj_data = self.objects.get(self.hovered_obj) if self.hovered_obj is not None else None
         # Draw tooltip for hovered object near mouse (skip points as they have persistent names)
         if hovered_obj_data and not isinstance(hovered_obj_data, Point) and self.last_mouse_widget_pos and hovered_obj_data.name not in ("org_x", "org_y"):
             painter.save()
@@ -330,103 +575,43 @@ class DrawingCanvas(QWidget):
                 painter.drawPoint(int(line.p1.x * sc), -int(line.p1.y * sc))
                 painter.drawPoint(int(line.p2.x * sc), -int(line.p2.y * sc))
 
-    def draw_axis(self, painter: QPainter, line: Line, is_hovered: bool):
-        base_color = QColor(200, 50, 50) if line.name == "org_x" else QColor(0, 165, 255)
-        color = QColor(255, 165, 0) if is_hovered else base_color
-        thickness = 0.5 if is_hovered else 0.3
-        pen = QPen(color, thickness * self.mm_to_px)
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        painter.setPen(pen)
-        painter.drawLine(
-            int(line.p1.x * self.scale * self.mm_to_px),
-            -int(line.p1.y * self.scale * self.mm_to_px),
-            int(line.p2.x * self.scale * self.mm_to_px),
-            -int(line.p2.y * self.scale * self.mm_to_px),
-        )
+    def draw_debug_overlay(self, painter: QPainter):
+        """Timings of the recent frames and how much of the scene is in view,
+        in the top left corner"""
+        top_left = self.map_to_logical(QPointF(0, 0))
+        bottom_right = self.map_to_logical(QPointF(self.width(), self.height()))
+        in_view = off_view = 0
+        for _, _, record in self.visible_objects():
+            min_x, min_y, max_x, max_y = record.bbox
+            if max_x < top_left.x() or min_x > bottom_right.x() or max_y < bottom_right.y() or min_y > top_left.y():
+                off_view += 1
+            else:
+                in_view += 1
+        stats = self.frame_stats()
+        lines = [
+            f"paint {stats['paint_mean_ms']:.1f} ms (max {stats['paint_max_ms']:.1f})",
+            f"tick {stats['tick_mean_ms']:.1f} ms (max {stats['tick_max_ms']:.1f})",
+            f"hover {stats['hover_mean_ms']:.2f} ms (max {stats['hover_max_ms']:.2f})",
+            f"objects {in_view} in view, {off_view} off view",
+            f"labels {self.labels_drawn} drawn, {self.labels_culled} culled",
+        ]
+        eval_time = self.eval_time_source() if self.eval_time_source is not None else None
+        if eval_time is not None:
+            lines.append(f"last edit eval {1000 * eval_time:.1f} ms")
 
-    def draw_point(self, painter: QPainter, point: Point, is_hovered: bool):
-        color = QColor(255, 165, 0) if is_hovered else QColor(0, 0, 255)
-        thickness = 0.8 if is_hovered else 0.5
-        pen = QPen(color, thickness * self.mm_to_px)
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        painter.setPen(pen)
-        pt = QPointF(
-            point.x * self.scale * self.mm_to_px,
-            -point.y * self.scale * self.mm_to_px,
-        )
-        painter.drawPoint(pt)
-        
-        # Draw point name persistently
-        mapped = painter.transform().map(pt)
         painter.save()
         painter.resetTransform()
-        text_pen = QPen(color)
-        painter.setPen(text_pen)
-        font = painter.font()
-        font.setPointSize(10)
+        font = QFont(painter.font())
+        font.setPointSize(9)
         painter.setFont(font)
-        painter.drawText(mapped + QPointF(6, -6), point.name)
-        painter.restore()
-
-    def draw_line(self, painter: QPainter, line: Line, is_hovered: bool):
-        color = QColor(255, 165, 0) if is_hovered else QColor(0, 0, 0)
-        thickness = style[line.style] + 0.2 if is_hovered else style[line.style]
-        pen = QPen(color, thickness * self.mm_to_px)
-        pen.setStyle(type[line.type])
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        painter.setPen(pen)
-        # Apply visual resize (t-parameters along p1→p2)
-        r1, r2 = getattr(line, 'resize', (0.0, 1.0))
-        dx = line.p2.x - line.p1.x
-        dy = line.p2.y - line.p1.y
-        sc = self.scale * self.mm_to_px
-        painter.drawLine(
-            int((line.p1.x + r1 * dx) * sc),
-            -int((line.p1.y + r1 * dy) * sc),
-            int((line.p1.x + r2 * dx) * sc),
-            -int((line.p1.y + r2 * dy) * sc),
-        )
-
-    def draw_circle(self, painter: QPainter, circle: Circle, is_hovered: bool):
-        color = QColor(255, 165, 0) if is_hovered else QColor(0, 0, 0)
-        thickness = style[circle.style] + 0.2 if is_hovered else style[circle.style]
-        pen = QPen(color, thickness * self.mm_to_px)
-        pen.setStyle(type[circle.type])
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        painter.setPen(pen)
-        draw_from = 0
-        span = 360 * 16
-        if circle.draw_from:
-            draw_from = (circle.draw_from) * 16
-        if circle.draw_span:
-            span = circle.draw_span * 16
-        painter.drawArc(
-            int((circle.center.x - circle.radius) * self.scale * self.mm_to_px),
-            -int((circle.center.y + circle.radius) * self.scale * self.mm_to_px),
-            int(2 * circle.radius * self.scale * self.mm_to_px),
-            int(2 * circle.radius * self.scale * self.mm_to_px),
-            int(draw_from),
-            int(span),
-        )
-
-    def draw_ellipse(self, painter: QPainter, ellipse: Ellipse, is_hovered: bool):
-        color = QColor(255, 165, 0) if is_hovered else QColor(0, 0, 0)
-        thickness = style[ellipse.style] + 0.2 if is_hovered else style[ellipse.style]
-        pen = QPen(color, thickness * self.mm_to_px)
-        pen.setStyle(type[ellipse.type])
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        painter.setPen(pen)
-        
-        painter.save()
-        cx = ellipse.center.x * self.scale * self.mm_to_px
-        cy = -ellipse.center.y * self.scale * self.mm_to_px
-        painter.translate(cx, cy)
-        painter.rotate(-math.degrees(ellipse.angle))
-        
-        a = ellipse.a * self.scale * self.mm_to_px
-        b = ellipse.b * self.scale * self.mm_to_px
-        
-        painter.drawEllipse(QPointF(0, 0), a, b)
+        line_height = painter.fontMetrics().height()
+        width = max(painter.fontMetrics().horizontalAdvance(line) for line in lines)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 180))
+        painter.drawRect(QRectF(8, 8, width + 12, line_height * len(lines) + 8))
+        painter.setPen(QColor(255, 255, 255))
+        for i, line in enumerate(lines):
+            painter.drawText(QPointF(14, 12 + line_height * (i + 1) - painter.fontMetrics().descent()), line)
         painter.restore()
 
     def map_to_logical(self, pos: QPointF) -> QPointF:
@@ -450,12 +635,126 @@ class DrawingCanvas(QWidget):
             logical_y / (self.scale * self.mm_to_px),
         )
 
-    def dist_point_to_line(self, px, py, x1, y1, x2, y2):
-        l2 = (x2 - x1) ** 2 + (y2 - y1) ** 2
-        if l2 == 0:
-            return math.hypot(px - x1, py - y1)
 
-        t = max(0, min(1, ((px - x1) * (x2 - x1) + (py - y1) * (y2 - y1)) / l2))
-        proj_x = x1 + t * (x2 - x1)
-        proj_y = y1 + t * (y2 - y1)
-        return math.hypot(px - proj_x, py - proj_y)
+class DrawingCanvas(CanvasBase, QWidget):
+    """The canvas, painted with QPainter on the CPU"""
+
+    selection_changed = pyqtSignal(list)
+    resize_confirmed = pyqtSignal(str, float, float)
+    drag_started = pyqtSignal(str)
+    point_dragged = pyqtSignal(str, float, float)
+    drag_finished = pyqtSignal(str)
+
+    def __init__(self, objects, settings=None):
+        QWidget.__init__(self)
+        self.setup_canvas(objects, settings)
+        self.axis_batch: list[tuple[QPen, QLine]] = []
+        self.line_batches: list[tuple[QPen, list[QLine], QPainterPath | None]] = []
+        self.point_batches: list[tuple[QPen, list[QPointF]]] = []
+
+    @override
+    def paintEvent(self, a0):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.draw_sheet(painter)
+        # Draw all objects
+        self.draw_objects(painter)
+        painter.end()
+        self.record_paint(started)
+
+    def build_batches(self):
+        """Batch every drawable object with its plain pen (see sort_batches)"""
+        self.axis_batch, self.line_batches, self.point_batches, self.label_batch = self.sort_batches(
+            self.visible_objects(), lambda pen_key: self.pen_for(pen_key, False)
+        )
+        self.batch_key = self.scene_key()
+
+    def sort_batches(self, visible, pen_of: Callable[[tuple], QPen]):
+        """Sort drawable objects by pen: straight lines into one QLine list
+        and polylines, circles and ellipses into one QPainterPath per pen,
+        and points into one list per pen, so a frame is a handful of painter
+        calls however many objects there are. pen_of gives the pen of a pen
+        key. Returns the axis, line, point and label batches."""
+        lines: dict[tuple, list[QLine]] = {}
+        curves: dict[tuple, QPainterPath] = {}
+        points: dict[tuple, list[QPointF]] = {}
+        axis_batch = []
+        label_batch = []
+        m = self.mm_to_px
+        for key, obj, record in visible:
+            paper = record.paper
+            if isinstance(obj, Point):
+                pt = QPointF(paper.x * m, -paper.y * m)
+                points.setdefault(record.pen_key, []).append(pt)
+                label_batch.append((pt, obj.name, key))
+            elif isinstance(obj, Line):
+                line = QLine(int(paper.x1 * m), -int(paper.y1 * m), int(paper.x2 * m), -int(paper.y2 * m))
+                if obj.name in ("org_x", "org_y"):
+                    axis_batch.append((pen_of(("axis", obj.name, None)), line))
+                else:
+                    lines.setdefault(record.pen_key, []).append(line)
+            else:
+                path = curves.get(record.pen_key)
+                if path is None:
+                    path = curves[record.pen_key] = QPainterPath()
+                if isinstance(obj, Polyline):
+                    self.add_polyline(path, paper)
+                else:
+                    self.add_curve(path, paper)
+
+        line_batches = [
+            (pen_of(pen_key), lines.get(pen_key, []), curves.get(pen_key))
+            for pen_key in dict.fromkeys([*lines, *curves])
+        ]
+        point_batches = [(pen_of(pen_key), pts) for pen_key, pts in points.items()]
+        return axis_batch, line_batches, point_batches, label_batch
+
+    def add_polyline(self, path: QPainterPath, paper):
+        """Append a polyline (paper units) to path, in pixels"""
+        pixels = (paper.vertices * (self.mm_to_px, -self.mm_to_px)).tolist()
+        path.addPolygon(QPolygonF([QPointF(x, y) for x, y in pixels]))
+        if paper.closed:
+            path.closeSubpath()
+
+    def add_curve(self, path: QPainterPath, paper):
+        """Append a circle, ellipse or arc of one (paper units) to path, in pixels"""
+        m = self.mm_to_px
+        rect = QRectF(-paper.rx * m, -paper.ry * m, 2 * paper.rx * m, 2 * paper.ry * m)
+        # Qt arc angles on an ellipse are parametric, like draw_from/draw_span
+        curve = QPainterPath()
+        if paper.is_closed:
+            curve.addEllipse(rect)
+        else:
+            curve.arcMoveTo(rect, paper.start)
+            curve.arcTo(rect, paper.start, paper.span)
+        transform = QTransform()
+        transform.translate(paper.cx * m, -paper.cy * m)
+        transform.rotate(-math.degrees(paper.angle))
+        path.addPath(transform.map(curve))
+
+    def draw_objects(self, painter: QPainter):
+        if self.batch_key != self.scene_key():
+            self.build_batches()
+        # The few highlighted objects are batched again every frame, so
+        # hovering never rebuilds the batches of the whole scene
+        to_device = painter.transform().m11() * painter.device().devicePixelRatioF()
+        hl_axes, hl_lines, hl_points, _ = self.sort_batches(
+            self.visible_objects(self.highlighted()), lambda pen_key: self.highlight_pen(pen_key, to_device)
+        )
+
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for pen, line in self.axis_batch + hl_axes:
+            painter.setPen(pen)
+            painter.drawLine(line)
+        for pen, lines, path in self.line_batches + hl_lines:
+            painter.setPen(pen)
+            if lines:
+                painter.drawLines(lines)
+            if path is not None:
+                painter.drawPath(path)
+        # Points on top
+        for pen, pts in self.point_batches + hl_points:
+            painter.setPen(pen)
+            painter.drawPoints(pts)
+        self.draw_overlays(painter)
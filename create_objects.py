@@ -1,21 +1,30 @@
-from math import degrees
+from math import degrees, radians
 
+import numpy as np
+
+from evaluator import MAX_SEQUENCE_LENGTH
 from geometry_math import (
     Circle,
     Ellipse,
     Line,
     Plane,
     Point,
+    Polyline,
     angle_to_horizontal,
+    circle_points,
+    ellipse_param_of,
     foot_of_perp,
-    generatePolygonPoints,
+    grid_points,
     intersect_circle2circle,
     intersect_circle2line,
     intersect_line2line,
+    line_crossings,
+    line_params,
     measure_point2point_distance,
     parallel_point_by_distance,
     parallel_point_by_line,
     perpendicular_point_from_distance,
+    regular_polygon,
 )
 
 org_x: Line = Line(
@@ -32,10 +41,10 @@ def createPoint(
     id, objects, cords: tuple[float, float | None, float | None], name: str
 ):
     if cords[1] is not None:
-        p1 = Point(id, (cords[0], -cords[1]), name + "1")
+        p1 = Point(id, (cords[0], -cords[1]), name + "1", projection=1)
         objects[name + "1"] = p1
     if cords[2] is not None:
-        p2 = Point(id, (cords[0], cords[2]), name + "2")
+        p2 = Point(id, (cords[0], cords[2]), name + "2", projection=2)
         objects[name + "2"] = p2
 
 
@@ -68,6 +77,43 @@ def createSplitSegment(id, objects, line_name: str, bound1: str, bound2: str, na
         objects[name] = Line(id, p1, p2, name)
 
 
+def splitLine(id, objects, line: str, cuts: list[str], name: str):
+    """Split a line into segments name_1, name_2, ... from p1 to p2, at the
+    given points and where the given lines cross it. All cuts are placed
+    along the line (and sorted) in one pass."""
+    line_obj = objects[line]
+    if type(line_obj) is not Line:
+        return
+    cut_objs = [objects[cut] for cut in cuts]
+    points = [obj for obj in cut_objs if type(obj) is Point]
+    knife_names = [cut for cut, obj in zip(cuts, cut_objs) if type(obj) is Line]
+    knives = np.array(
+        [(k.p1.x, k.p1.y, k.p2.x, k.p2.y) for k in cut_objs if type(k) is Line], dtype=float
+    ).reshape(-1, 4)
+
+    t_knives, crossing = line_crossings(line_obj, knives)
+    t_knives = t_knives[crossing]
+    p1 = np.array((line_obj.p1.x, line_obj.p1.y))
+    p2 = np.array((line_obj.p2.x, line_obj.p2.y))
+    # Where the knives cross; like createSplitSegment's, these are not objects
+    crossings = Point.many(
+        id,
+        p1 + t_knives[:, None] * (p2 - p1),
+        [f"{name}_{knife}" for knife, ok in zip(knife_names, crossing.tolist()) if ok],
+    )
+    for point in crossings:
+        point.type = "none"
+
+    t_points = line_params(line_obj, np.array([(p.x, p.y) for p in points], dtype=float).reshape(-1, 2))
+    bounds = points + crossings
+    order = np.argsort(np.concatenate((t_points, t_knives)), kind="stable")
+    ends = [line_obj.p1, *(bounds[i] for i in order.tolist()), line_obj.p2]
+    objects.update(
+        (f"{name}_{i + 1}", Line(id, start, end, f"{name}_{i + 1}"))
+        for i, (start, end) in enumerate(zip(ends, ends[1:]))
+    )
+
+
 def createCircle(id, objects, p_name: str, radius: float, name: str):
     p = objects[p_name]
     if type(p) is Point:
@@ -91,16 +137,56 @@ def createPlane(id, objects, cords: tuple[float, float | str, float | str], name
     objects[name + "2"] = plane.line2
 
 
+# Fixed objects: plain coordinates instead of a construction. Removing an
+# object can leave what was built from it behind in this form (see
+# Project.remove_element). Coordinates are given like Point's.
+
+
+def fixedPoint(id, objects, cords: tuple[float, float], name: str):
+    objects[name] = Point(id, cords, name)
+
+
+def fixedLine(id, objects, p1: tuple[float, float], p2: tuple[float, float], name: str):
+    objects[name] = Line(id, Point(id, p1, "_" + name + "1"), Point(id, p2, "_" + name + "2"), name)
+
+
+def fixedPolyline(id, objects, vertices: list[tuple[float, float]], name: str, closed: bool = False):
+    cords = np.array(vertices, dtype=float).reshape(-1, 2)
+    cords[:, 0] *= -1
+    objects[name] = Polyline(id, cords, name, closed)
+
+
+def fixedCircle(
+    id,
+    objects,
+    center: tuple[float, float],
+    radius: float,
+    name: str,
+    draw_from: float | None = None,
+    draw_span: float | None = None,
+):
+    objects[name] = Circle(id, Point(id, center, "_" + name + "0"), radius, name, draw_from, draw_span)
+
+
+def createPolyline(id, objects, points: list[str], name: str, closed: bool = False):
+    """One object through the named points in order; closed makes it a
+    polygon"""
+    point_objs = [objects[point] for point in points]
+    if not point_objs or any(type(p) is not Point for p in point_objs):
+        return
+    objects[name] = Polyline(id, [(p.x, p.y) for p in point_objs], name, closed)
+
+
 def setType(objects, obj: str, line_type: str):
     object = objects[obj]
-    if type(object) is not Circle and type(object) is not Line:
+    if type(object) not in (Circle, Line, Polyline):
         return
     object.type = line_type
 
 
 def setStyle(objects, obj: str, line_style: str):
     object = objects[obj]
-    if type(object) is not Circle and type(object) is not Line:
+    if type(object) not in (Circle, Line, Polyline):
         return
     object.style = line_style
 
@@ -118,7 +204,7 @@ def setVisibilities(objects, vis_dict: dict):
     for obj_name, props in vis_dict.items():
         if obj_name in objects:
             obj = objects[obj_name]
-            if type(obj) is Circle or type(obj) is Line:
+            if type(obj) in (Circle, Line, Polyline):
                 if len(props) > 0:
                     obj.style = props[0]
                 if len(props) > 1:
@@ -145,6 +231,29 @@ def setCircleDrawRange(id: int, objects, circle: str, point_from: str, point_to:
     circle_obj.draw_span = draw_span
 
 
+def setEllipseDrawRange(id: int, objects, ellipse: str, point_from: str, point_to: str):
+    """Draw only the arc of the ellipse from point_from to point_to,
+    counterclockwise. The points need not lie on the ellipse; each one
+    picks the ellipse point in its direction from the center."""
+    ellipse_obj = objects[ellipse]
+    point_from_obj = objects[point_from]
+    point_to_obj = objects[point_to]
+    if (
+        not isinstance(ellipse_obj, Ellipse)
+        or not isinstance(point_from_obj, Point)
+        or not isinstance(point_to_obj, Point)
+    ):
+        return
+    start_angle = degrees(ellipse_param_of(ellipse_obj, point_from_obj))
+    end_angle = degrees(ellipse_param_of(ellipse_obj, point_to_obj))
+    draw_span = end_angle - start_angle
+    if draw_span < 0:
+        draw_span += 360
+
+    ellipse_obj.draw_from = start_angle
+    ellipse_obj.draw_span = draw_span
+
+
 def footToLine(id, objects, point: str, line: str, name: str):
     point_obj = objects[point]
     line_obj = objects[line]
@@ -250,21 +359,21 @@ def findPointWithPlane(
     if p1 is None:
         return
 
-    if pointobj.name.endswith("1"):
+    if pointobj.projection == 1:
         newname = pointobj.name[:-1] + "2"
         p2 = parallel_point_by_line(id, pointobj, planeobj.line1, org_x, "")
         if p2 is None:
             return
         p3 = parallel_point_by_line(id, p2, org_y, planeobj.line2, "")
 
-    elif pointobj.name.endswith("2"):
+    elif pointobj.projection == 2:
         newname = pointobj.name[:-1] + "1"
         p2 = parallel_point_by_line(id, pointobj, planeobj.line2, org_x, "")
         if p2 is None:
             return
         p3 = parallel_point_by_line(id, p2, org_y, planeobj.line1, "")
     else:
-        raise ValueError(f"Name {pointobj.name} has no 1/2 suffix")
+        raise ValueError(f"Point {pointobj.name} is in neither projection")
     if not p3:
         return
     if new_name:
@@ -286,16 +395,61 @@ def measureDistance(objects, obj1: str, obj2: str | None = None):
         return measure_point2point_distance(object1, object2)
 
 
-def createPolygon(id, objects, center: str, startpoint: str, points: list[str]):
+def createPolygon(
+    id, objects, center: str, startpoint: str, points: list[str], outline: str | None = None
+):
+    """A regular polygon around center, starting at startpoint; its other
+    vertices are named by points. outline names a closed Polyline along
+    the edges."""
     center_obj = objects[center]
     startpoint_obj = objects[startpoint]
     if type(center_obj) is not Point or type(startpoint_obj) is not Point:
         return None
-    n = len(points) + 1
-    polygon_points = generatePolygonPoints(id, center_obj, startpoint_obj, n)
-    for coord, name in zip(polygon_points[1:], points):
-        p = Point(id, coord, name)
-        objects[name] = p
+    vertices = regular_polygon(center_obj, startpoint_obj, len(points) + 1)
+    _add_points(id, objects, vertices[1:], points, startpoint_obj.projection)
+    if outline is not None:
+        objects[outline] = Polyline(id, vertices, outline, closed=True)
+
+
+def createCirclePoints(
+    id, objects, circle: str, points: list[str], start: float = 0.0, outline: str | None = None
+):
+    """Points evenly spaced on a circle, counterclockwise from the angle
+    start (degrees from horizontal). outline names a closed Polyline
+    through them."""
+    circle_obj = objects[circle]
+    if type(circle_obj) is not Circle:
+        return None
+    center = circle_obj.center
+    cords = circle_points(center.x, center.y, circle_obj.radius, len(points), radians(start))
+    _add_points(id, objects, cords, points, center.projection)
+    if outline is not None:
+        objects[outline] = Polyline(id, cords, outline, closed=True)
+
+
+def createGrid(
+    id, objects, origin: str, spacing: tuple[float, float], size: tuple[int, int], prefix: str
+):
+    """A grid of size = (columns, rows) points from origin, spacing apart
+    to the right and up on the sheet, named prefix_row_column."""
+    origin_obj = objects[origin]
+    if type(origin_obj) is not Point:
+        return None
+    columns, rows = size
+    if columns < 0 or rows < 0 or columns * rows > MAX_SEQUENCE_LENGTH:
+        print(f"A grid of {columns} x {rows} points is too large (at most {MAX_SEQUENCE_LENGTH})")
+        return None
+    cords = grid_points(origin_obj.x, origin_obj.y, spacing[0], spacing[1], columns, rows)
+    names = [f"{prefix}_{row}_{column}" for row in range(rows) for column in range(columns)]
+    _add_points(id, objects, cords, names, origin_obj.projection)
+
+
+def _add_points(id, objects, cords, names: list[str], projection: int | None) -> list[Point]:
+    """Points at the logical coordinates in the (n, 2) array cords, added
+    to objects with a single update"""
+    points = Point.many(id, cords, names, projection)
+    objects.update(zip(names, points))
+    return points
 
 
 def getObject(objects, name: str):
@@ -1,12 +1,53 @@
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+
+def text_hash(text: str | None) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
 class Document:
     def __init__(self):
         self.file_path = ""
         self.file: str | None = None
+        # Editors fire several events per save (truncate, write, rename...),
+        # so changes are only reported once the file has been quiet this long.
+        self.debounce_seconds = 0.3
+        self._observer = None
+        self._debounce_timer: threading.Timer | None = None
+        self._on_change: Callable[[str], None] | None = None
+        # One worker, so background saves land on disk in the order issued.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongoose-save")
+        self._pending_save: Future | None = None
+        # Whether the last save failed; its edits are then only in the journal
+        self.save_failed = False
+        # Called from the writer thread with the error of a failed background save
+        self.on_save_error: Callable[[str], None] | None = None
+
+    @property
+    def file(self) -> str | None:
+        return self._file
+
+    @file.setter
+    def file(self, text: str | None) -> None:
+        self._file = text
+        # Kept alongside the text so a streamed open, which never holds the
+        # whole file, can still be compared against.
+        self.file_hash = text_hash(text)
 
     def create(self):
         pass
 
     def open(self, file_path):
+        self.unwatch()
         self.file_path = file_path
         file_obj = open(self.file_path, "r")
         if not file_obj:
@@ -14,14 +55,170 @@ class Document:
         else:
             self.file = file_obj.read()
 
+    def open_lines(self, file_path) -> Iterator[str]:
+        """Open file_path and yield its lines one at a time instead of
+        reading it whole. The text is not kept; only its hash is."""
+        self.unwatch()
+        self.file_path = file_path
+        self.file = None
+        digest = hashlib.sha1()
+        with open(self.file_path, "r") as file_obj:
+            for line in file_obj:
+                digest.update(line.encode("utf-8"))
+                yield line
+        self.file_hash = digest.hexdigest()
+
     def new(self):
+        self.unwatch()
         self.file_path = ""
         self.file = ""
 
-    def save(self):
-        with open(self.file_path, "w") as file_obj:
-            if self.file is not None:
-                file_obj.write(self.file)
+    def save(self, background: bool = False) -> Future | None:
+        """Write the document atomically: the text goes to a temporary file in
+        the same directory, is fsynced, and then replaces the original, so a
+        crash mid-save never leaves a truncated project behind. With
+        background=True the write happens on a worker thread and its Future
+        is returned."""
+        if self.file is None:
+            return None
+        text = self.file
+        path = self.file_path
+        if not background:
+            self.wait_for_save()
+            try:
+                _atomic_write(path, text)
+            except OSError:
+                self.save_failed = True
+                raise
+            self.save_failed = False
+            return None
+        self._pending_save = self._writer.submit(_atomic_write, path, text)
+        self._pending_save.add_done_callback(self._save_done)
+        return self._pending_save
+
+    def _save_done(self, future: Future) -> None:
+        error = future.exception()
+        self.save_failed = error is not None
+        if error is not None:
+            print(f"Failed to save project: {error}")
+            if self.on_save_error is not None:
+                self.on_save_error(str(error))
+
+    def wait_for_save(self) -> None:
+        """Block until a background save (if any) has reached the disk."""
+        pending = self._pending_save
+        if pending is not None:
+            # Done callbacks may still be running: take the outcome from here
+            try:
+                pending.result()
+            except OSError:
+                self.save_failed = True
+            else:
+                self.save_failed = False
+            self._pending_save = None
+
+    def watch(self, on_change: Callable[[str], None]) -> None:
+        """Watch file_path for saves made by other programs. on_change is
+        called from a background thread with the new file contents."""
+        self.unwatch()
+        if not self.file_path:
+            return
+        self._on_change = on_change
+        self._observer = Observer()
+        self._observer.schedule(
+            _FileChangeHandler(self),
+            os.path.dirname(os.path.abspath(self.file_path)),
+            recursive=False,
+        )
+        self._observer.daemon = True
+        self._observer.start()
+
+    def unwatch(self) -> None:
+        if self._debounce_timer is not None:
+            self._debounce_timer.cancel()
+            self._debounce_timer = None
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        self._on_change = None
+
+    def is_watching(self) -> bool:
+        return self._observer is not None
+
+    def _schedule_reload(self) -> None:
+        if self._debounce_timer is not None:
+            self._debounce_timer.cancel()
+        self._debounce_timer = threading.Timer(self.debounce_seconds, self._emit_change)
+        self._debounce_timer.daemon = True
+        self._debounce_timer.start()
+
+    def _emit_change(self) -> None:
+        on_change = self._on_change
+        if on_change is None:
+            return
+        try:
+            with open(self.file_path, "r") as file_obj:
+                text = file_obj.read()
+        except OSError:
+            # The file is mid-replace; the next event will bring us back here.
+            return
+        # Our own saves come back as events too; nothing to do for those.
+        if text_hash(text) == self.file_hash:
+            return
+        on_change(text)
+
+
+def _atomic_write(path: str, text: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w") as file_obj:
+            file_obj.write(text)
+            file_obj.flush()
+            os.fsync(file_obj.fileno())
+        # mkstemp creates the file as 0600; keep the permissions the project
+        # file already had (or the usual umask default for a new one).
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable.
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+# Reading the file ourselves produces "opened" events, so only writes count.
+_WRITE_EVENTS = {"modified", "created", "moved", "closed"}
+
+
+class _FileChangeHandler(FileSystemEventHandler):
+    def __init__(self, document: Document):
+        super().__init__()
+        self.document = document
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type not in _WRITE_EVENTS:
+            return
+        target = os.path.abspath(self.document.file_path)
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if any(path and os.path.abspath(path) == target for path in paths):
+            self.document._schedule_reload()
 
 
 if __name__ == "__main__":
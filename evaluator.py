@@ -0,0 +1,182 @@
+import ast
+import math
+import operator
+import weakref
+from typing import Any, Callable
+
+# Arguments and assignments in .mgs scripts are plain arithmetic over
+# numbers, strings, variables, math.* and a couple of object queries, e.g.
+#     d = getObject("B1").y - getObject("A1").y
+#     createCircle("S1", math.sqrt(2) * d, "k")
+# Evaluator runs exactly that on the already parsed AST and refuses
+# everything else, so opening a script cannot run arbitrary Python.
+
+
+class UnsafeExpressionError(ValueError):
+    """The expression uses something the script language does not allow."""
+
+
+_BINARY_OPS: dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS: dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+_CONSTANT_TYPES = (int, float, str, bool, type(None))
+# The part of math.* a script may use: functions whose cost does not grow
+# with their arguments (factorial, comb, perm, prod, lcm... are left out).
+_MATH = {
+    name: getattr(math, name)
+    for name in (
+        "pi", "e", "tau", "inf", "nan",
+        "sqrt", "cbrt", "exp", "log", "log10", "log2", "pow", "hypot", "dist",
+        "sin", "cos", "tan", "asin", "acos", "atan", "atan2",
+        "sinh", "cosh", "tanh", "asinh", "acosh", "atanh",
+        "degrees", "radians", "fabs", "copysign", "fmod", "remainder",
+        "floor", "ceil", "trunc", "isclose", "isfinite", "isinf", "isnan",
+    )
+    if hasattr(math, name)  # cbrt is new in 3.11
+}
+
+# What a script may read from the objects getObject() returns.
+OBJECT_ATTRIBUTES = {
+    "x", "y", "name", "radius", "a", "b", "angle", "center", "p0", "p1", "p2",
+    "a_point", "on_point", "line1", "line2", "draw_from", "draw_span",
+    "resize", "type", "style",
+}
+
+# Keeps a hostile file from asking for astronomically large numbers or strings.
+# Only * and ** make an int much longer than its operands; * and + make a
+# string, tuple or list longer, and % formatting pads a string to any width.
+# Capping those results bounds every chain of them (x = 9**999; y = x**999,
+# or a = "x" * 99999; b = a + a; c = b + b; ...).
+MAX_EXPONENT = 1000
+MAX_INT_BITS = 10_000
+MAX_SEQUENCE_LENGTH = 100_000
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _checked_pow(base, exponent):
+    if isinstance(exponent, (int, float)) and abs(exponent) > MAX_EXPONENT:
+        raise UnsafeExpressionError(f"Exponent {exponent} is too large")
+    if _is_int(base) and _is_int(exponent) and exponent > 0:
+        if base.bit_length() * exponent > MAX_INT_BITS:
+            raise UnsafeExpressionError("Result of ** is too large")
+    return operator.pow(base, exponent)
+
+
+def _checked_mul(left, right):
+    for seq, count in ((left, right), (right, left)):
+        if isinstance(seq, (str, tuple, list)) and isinstance(count, int):
+            if len(seq) * count > MAX_SEQUENCE_LENGTH:
+                raise UnsafeExpressionError("Repeated sequence is too long")
+    if _is_int(left) and _is_int(right):
+        if left.bit_length() + right.bit_length() > MAX_INT_BITS:
+            raise UnsafeExpressionError("Result of * is too large")
+    return operator.mul(left, right)
+
+
+def _checked_add(left, right):
+    if isinstance(left, (str, tuple, list)) and isinstance(right, (str, tuple, list)):
+        if len(left) + len(right) > MAX_SEQUENCE_LENGTH:
+            raise UnsafeExpressionError("Joined sequence is too long")
+    return operator.add(left, right)
+
+
+def _checked_mod(left, right):
+    if isinstance(left, str):
+        # "%0999999999d" % 1 - the width is not known before formatting
+        raise UnsafeExpressionError("String formatting with % is not allowed")
+    return operator.mod(left, right)
+
+
+_BINARY_OPS[ast.Pow] = _checked_pow
+_BINARY_OPS[ast.Mult] = _checked_mul
+_BINARY_OPS[ast.Add] = _checked_add
+_BINARY_OPS[ast.Mod] = _checked_mod
+
+
+class Evaluator:
+    """Evaluates script expressions straight from their AST nodes.
+
+    Each node is compiled once into a tree of small closures (cached per
+    node), so evaluating it again - on every rebuild or while dragging - is
+    just a few Python calls, with no unparse/compile/eval round trip."""
+
+    def __init__(self, functions: dict[str, Callable[..., Any]], constants: dict[str, Any]):
+        self.functions = functions
+        self.constants = constants
+        self._compiled: weakref.WeakKeyDictionary[ast.AST, Callable[[dict], Any]] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def evaluate(self, node: ast.expr, variables: dict[str, Any]) -> Any:
+        compiled = self._compiled.get(node)
+        if compiled is None:
+            compiled = self.compile(node)
+            self._compiled[node] = compiled
+        return compiled(variables)
+
+    def compile(self, node: ast.expr) -> Callable[[dict], Any]:
+        match node:
+            case ast.Constant(value=value) if isinstance(value, _CONSTANT_TYPES):
+                return lambda variables: value
+            case ast.Tuple(elts=elts) | ast.List(elts=elts):
+                items = [self.compile(elt) for elt in elts]
+                container = tuple if isinstance(node, ast.Tuple) else list
+                return lambda variables: container(item(variables) for item in items)
+            case ast.Dict(keys=keys, values=values) if None not in keys:
+                pairs = [(self.compile(k), self.compile(v)) for k, v in zip(keys, values)]
+                return lambda variables: {k(variables): v(variables) for k, v in pairs}
+            case ast.UnaryOp(op=op, operand=operand) if type(op) in _UNARY_OPS:
+                unary = _UNARY_OPS[type(op)]
+                value = self.compile(operand)
+                return lambda variables: unary(value(variables))
+            case ast.BinOp(left=left, op=op, right=right) if type(op) in _BINARY_OPS:
+                binary = _BINARY_OPS[type(op)]
+                lhs = self.compile(left)
+                rhs = self.compile(right)
+                return lambda variables: binary(lhs(variables), rhs(variables))
+            case ast.Name(id=name):
+                return self._compile_name(name)
+            case ast.Attribute(value=ast.Name(id="math"), attr=attr) if attr in _MATH:
+                value = _MATH[attr]
+                return lambda variables: value
+            case ast.Attribute(value=value, attr=attr) if attr in OBJECT_ATTRIBUTES:
+                target = self.compile(value)
+                return lambda variables: getattr(target(variables), attr)
+            case ast.Call(func=func, args=args, keywords=[]):
+                function = self._compile_callee(func)
+                arguments = [self.compile(arg) for arg in args]
+                return lambda variables: function(*[arg(variables) for arg in arguments])
+        raise UnsafeExpressionError(f"'{ast.unparse(node)}' is not allowed in scripts")
+
+    def _compile_name(self, name: str) -> Callable[[dict], Any]:
+        constants = self.constants
+
+        def lookup(variables):
+            if name in variables:
+                return variables[name]
+            if name in constants:
+                return constants[name]
+            raise NameError(f"name '{name}' is not defined")
+
+        return lookup
+
+    def _compile_callee(self, func: ast.expr) -> Callable[..., Any]:
+        match func:
+            case ast.Name(id=name) if name in self.functions:
+                return self.functions[name]
+            case ast.Attribute(value=ast.Name(id="math"), attr=attr) if callable(_MATH.get(attr)):
+                return _MATH[attr]
+        raise UnsafeExpressionError(f"Calling '{ast.unparse(func)}' is not allowed in scripts")
@@ -5,6 +5,16 @@ import math
 import os
 import base64
 import subprocess
+from datetime import date
+
+import numpy as np
+
+from PyQt6.QtCore import QByteArray, QMarginsF, QRectF, QSizeF
+from PyQt6.QtGui import QFontDatabase, QPageSize, QPainter, QPdfWriter
+from PyQt6.QtSvg import QSvgRenderer
+
+from project import Project
+from render_geometry import MM_PER_UNIT, record_of
 
 
 class SVGExport:
@@ -22,9 +32,11 @@ class SVGExport:
         self.name = ""
         self.lastname_class = ""
         self.number_date = ""
+        # Family of the title block text; _get_embedded_font_style embeds osifont
+        self.font_family = "osifont"
 
         # Coordinate system: 1 unit = 10mm
-        self.mm_per_unit = 10
+        self.mm_per_unit = MM_PER_UNIT
         self.point_size_mm = 3  # Size of + symbol in mm
 
         # Calculate view bounds
@@ -37,6 +49,12 @@ class SVGExport:
 
         self.hidden_lines_style = "normal"
 
+        # "native" keeps <circle>/<ellipse>/arc elements; "bezier" and
+        # "polyline" flatten them to within curve_tolerance (mm)
+        self.curve_mode = "native"
+        self.curve_tolerance = 0.01
+        self._pending_curves = []
+
     def set_workname(self, workname="Název výkresu"):
         self.name = workname
 
@@ -52,6 +70,10 @@ class SVGExport:
     def set_hidden_lines_style(self, hidden_lines_style="normal"):
         self.hidden_lines_style = hidden_lines_style
 
+    def set_curve_mode(self, curve_mode="native", tolerance=0.01):
+        self.curve_mode = curve_mode
+        self.curve_tolerance = tolerance
+
     def set_offset(self, offset_x=0.0, offset_y=0.0):
         self.offset_x = offset_x
         self.offset_y = offset_y
@@ -66,14 +88,20 @@ class SVGExport:
     def transform_x(self, x):
         """Transform mathematical x-coordinate to SVG x-coordinate (centered on A4)"""
         # Direct mm conversion: 1 coordinate unit = 10mm
-        x_mm = x * self.mm_per_unit
-        # Center horizontally on A4
-        return self.width / 2 + x_mm + self.offset_x
+        return self.paper_x(x * self.mm_per_unit)
 
     def transform_y(self, y):
         """Transform mathematical y-coordinate to SVG y-coordinate (centered on A4, inverted)"""
         # Direct mm conversion: 1 coordinate unit = 10mm
-        y_mm = y * self.mm_per_unit
+        return self.paper_y(y * self.mm_per_unit)
+
+    def paper_x(self, x_mm):
+        """Paper x (mm from the drawing origin) to SVG x"""
+        # Center horizontally on A4
+        return self.width / 2 + x_mm + self.offset_x
+
+    def paper_y(self, y_mm):
+        """Paper y (mm from the drawing origin, y up) to SVG y"""
         # Center vertically on A4, invert Y axis
         return self.height / 2 - y_mm - self.offset_y
 
@@ -180,27 +208,28 @@ class SVGExport:
         # Name of the work
         self.svg_elements.append(
             f'<text x="{cx:.2f}" y="17.00" '
-            f'fill="black" font-size="7" font-family="osifont" '
+            f'fill="black" font-size="7" font-family="{self.font_family}" '
             f'text-anchor="middle" dominant-baseline="baseline">'
             f"{self.name}</text>"
         )
         # Name and date
         self.svg_elements.append(
             f'<text x="10.00" y="{(self.height - 10):.2f}" '
-            f'fill="black" font-size="7" font-family="osifont" '
+            f'fill="black" font-size="7" font-family="{self.font_family}" '
             f'text-anchor="start" dominant-baseline="baseline">'
             f"{self.lastname_class}</text>"
         )
         self.svg_elements.append(
             f'<text x="{(self.width - 10):.2f}" y="{(self.height - 10):.2f}" '
-            f'fill="black" font-size="7" font-family="osifont" '
+            f'fill="black" font-size="7" font-family="{self.font_family}" '
             f'text-anchor="end" dominant-baseline="baseline">'
             f"{self.number_date}</text>"
         )
 
     def drawPoint(self, point: Point):
-        x = self.transform_x(point.x)
-        y = self.transform_y(point.y)
+        paper = record_of(point).paper
+        x = self.paper_x(paper.x)
+        y = self.paper_y(paper.y)
 
         half_size = self.point_size_mm / 2
 
@@ -232,18 +261,11 @@ class SVGExport:
             return
         width, style = self.convertStyle(line)
 
-        r1, r2 = line.resize
-        dx = line.p2.x - line.p1.x
-        dy = line.p2.y - line.p1.y
-        x1 = line.p1.x + r1 * dx
-        y1 = line.p1.y + r1 * dy
-        x2 = line.p1.x + r2 * dx
-        y2 = line.p1.y + r2 * dy
-
-        svg_x1 = self.transform_x(x1)
-        svg_y1 = self.transform_y(y1)
-        svg_x2 = self.transform_x(x2)
-        svg_y2 = self.transform_y(y2)
+        paper = record_of(line).paper
+        svg_x1 = self.paper_x(paper.x1)
+        svg_y1 = self.paper_y(paper.y1)
+        svg_x2 = self.paper_x(paper.x2)
+        svg_y2 = self.paper_y(paper.y2)
 
         dasharray = self.get_dasharray(style)
         dash_attr = f'stroke-dasharray="{dasharray}"' if dasharray else ""
@@ -254,6 +276,32 @@ class SVGExport:
             f'stroke="{self.line_colors}" stroke-width="{width}" {dash_attr}/>'
         )
 
+    def drawPolyline(self, polyline: Polyline):
+        """One <path> for the whole polyline"""
+        if polyline.type == "none":
+            return
+        if polyline.type == "hidden" and self.hidden_lines_style == "none":
+            return
+        if polyline.type == "realsized" and self.hidden_lines_style == "none":
+            return
+        width, style = self.convertStyle(polyline)
+        record = record_of(polyline)
+        if record is None:
+            return
+
+        paper = record.paper
+        xs = self.paper_x(paper.vertices[:, 0])
+        ys = self.paper_y(paper.vertices[:, 1])
+        d = "M" + " L".join(f"{x:.2f} {y:.2f}" for x, y in zip(xs.tolist(), ys.tolist()))
+        if paper.closed:
+            d += " Z"
+
+        dasharray = self.get_dasharray(style)
+        dash_attr = f'stroke-dasharray="{dasharray}"' if dasharray else ""
+        self.svg_elements.append(
+            f'<path d="{d}" fill="none" stroke="{self.line_colors}" stroke-width="{width}" {dash_attr}/>'
+        )
+
     def drawCircle(self, circle: Circle):
         if circle.type == "none":
             return
@@ -265,18 +313,25 @@ class SVGExport:
         dasharray = self.get_dasharray(style)
         dash_attr = f'stroke-dasharray="{dasharray}"' if dasharray else ""
 
-        cx = self.transform_x(circle.center.x)
-        cy = self.transform_y(circle.center.y)
-        r = self.transform_length(circle.radius)
-
-        if circle.draw_from is None or circle.draw_span is None:
+        geometry = record_of(circle).paper
+        cx = self.paper_x(geometry.cx)
+        cy = self.paper_y(geometry.cy)
+        r = geometry.rx
+
+        if self.curve_mode != "native":
+            if geometry.is_closed:
+                start, span = 0.0, 2 * math.pi
+            else:
+                start, span = math.radians(geometry.start), math.radians(geometry.span)
+            self._queue_curve(cx, cy, r, r, 0.0, start, span, width, dash_attr)
+        elif geometry.is_closed:
             self.svg_elements.append(
                 f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{r:.2f}" '
                 f'fill="none" stroke="black" stroke-width="{width}" {dash_attr}/>'
             )
         else:
-            start_angle = math.radians(circle.draw_from)
-            end_angle = start_angle + math.radians(circle.draw_span)
+            start_angle = math.radians(geometry.start)
+            end_angle = start_angle + math.radians(geometry.span)
 
             start_x = cx + r * math.cos(start_angle)
             start_y = cy - r * math.sin(start_angle)
@@ -301,12 +356,33 @@ class SVGExport:
         dasharray = self.get_dasharray(style)
         dash_attr = f'stroke-dasharray="{dasharray}"' if dasharray else ""
 
-        cx = self.transform_x(ellipse.center.x)
-        cy = self.transform_y(ellipse.center.y)
-        rx = self.transform_length(ellipse.a)
-        ry = self.transform_length(ellipse.b)
+        geometry = record_of(ellipse).paper
+        cx = self.paper_x(geometry.cx)
+        cy = self.paper_y(geometry.cy)
+        rx = geometry.rx
+        ry = geometry.ry
+
+        if self.curve_mode != "native":
+            if geometry.is_closed:
+                start, span = 0.0, 2 * math.pi
+            else:
+                start, span = math.radians(geometry.start), math.radians(geometry.span)
+            self._queue_curve(cx, cy, rx, ry, geometry.angle, start, span, width, dash_attr)
+            return
+
+        angle_deg = -math.degrees(geometry.angle)
+        if not geometry.is_closed:
+            start_x, start_y = geometry.point_at(geometry.start)
+            end_x, end_y = geometry.point_at(geometry.start + geometry.span)
+            large_arc = 1 if geometry.span > 180 else 0
+            self.svg_elements.append(
+                f'<path d="M {self.paper_x(start_x):.2f} {self.paper_y(start_y):.2f} '
+                f'A {rx:.2f} {ry:.2f} {angle_deg:.2f} {large_arc} 0 '
+                f'{self.paper_x(end_x):.2f} {self.paper_y(end_y):.2f}" '
+                f'fill="none" stroke="black" stroke-width="{width}" {dash_attr}/>'
+            )
+            return
 
-        angle_deg = -math.degrees(ellipse.angle)
         transform = f'transform="rotate({angle_deg:.2f} {cx:.2f} {cy:.2f})"'
 
         self.svg_elements.append(
@@ -314,6 +390,29 @@ class SVGExport:
             f'fill="none" stroke="black" stroke-width="{width}" {dash_attr} {transform}/>'
         )
 
+    def _queue_curve(self, cx, cy, rx, ry, angle, start, span, width, dash_attr):
+        """Reserve the curve's place among the SVG elements; its path is
+        computed later, together with all other curves, by flushCurves."""
+        self._pending_curves.append(
+            (len(self.svg_elements), cx, cy, rx, ry, angle, start, span, width, dash_attr)
+        )
+        self.svg_elements.append("")
+
+    def flushCurves(self):
+        """Flatten every queued circle, arc and ellipse in one vectorized
+        pass and fill in their <path> elements"""
+        if not self._pending_curves:
+            return
+        slots, cx, cy, rx, ry, angle, start, span, widths, dashes = zip(*self._pending_curves)
+        self._pending_curves = []
+        paths = flatten_arcs(
+            np.array(cx), np.array(cy), np.array(rx), np.array(ry), np.array(angle),
+            np.array(start), np.array(span), self.curve_tolerance, self.curve_mode,
+        )
+        for slot, d, width, dash_attr in zip(slots, paths, widths, dashes):
+            self.svg_elements[slot] = (
+                f'<path d="{d}" fill="none" stroke="black" stroke-width="{width}" {dash_attr}/>'
+            )
 
     def drawAxis(self):
         y_axis = self.transform_y(0)
@@ -348,7 +447,12 @@ class SVGExport:
 
         self.drawAxis()
         self.drawTemplate()
+        self.drawObjects(objects)
+
+        self.save(filename)
 
+    def drawObjects(self, objects: dict[str, Point | Line | Circle | Plane]) -> None:
+        """Draw every visible object of the scene"""
         for obj in objects.values():
             if getattr(obj, "hidden", False):
                 continue
@@ -357,15 +461,28 @@ class SVGExport:
                     self.drawPoint(obj)
                 case Line():
                     self.drawLine(obj)
+                case Polyline():
+                    self.drawPolyline(obj)
                 case Circle():
                     self.drawCircle(obj)
                 case Ellipse():
                     self.drawEllipse(obj)
-
-        self.save(filename)
+        self.flushCurves()
+
+    def drawFrames(self, frames, filename_pattern: str = "frame_{index:03d}.svg") -> list[str]:
+        """Save one SVG per (value, objects) frame, e.g. from Project.sweep().
+        Frames are written as they arrive, so the generator is never held
+        in memory as a whole. The pattern may use {index} and {value}."""
+        filenames = []
+        for index, (value, objects) in enumerate(frames):
+            filename = filename_pattern.format(index=index, value=value)
+            self.drawScene(objects, filename)
+            filenames.append(filename)
+        return filenames
 
     def save(self, filename: str = "output.svg"):
         """Save the SVG to a file"""
+        self.flushCurves()
         svg_content = f'''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
             <svg width="{self.width}mm" height="{self.height}mm"
                 viewBox="0 0 {self.width} {self.height}"
@@ -380,6 +497,7 @@ class SVGExport:
 
     def get_svg_string(self) -> str:
         """Return the SVG as a string"""
+        self.flushCurves()
         return f'''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
             <svg width="{self.width}mm" height="{self.height}mm"
                 viewBox="0 0 {self.width} {self.height}"
@@ -408,3 +526,147 @@ class SVGExport:
         if object.style == "bold":
             width = 0.1
         return width, style
+
+
+def flatten_arcs(cx, cy, rx, ry, angle, start, span, tolerance, mode="bezier"):
+    """Approximate elliptical arcs by cubic Béziers or polylines, all arcs
+    at once. Arrays give, per arc, the SVG center, radii, rotation (math
+    angle, y up), start parameter and signed span in radians. Returns one
+    SVG path string per arc, never more than `tolerance` off the curve.
+
+    Segments are laid out on the unit circle and mapped onto each ellipse
+    with its affine transform; Béziers survive that exactly, so an error
+    bound for a circle of radius max(rx, ry) holds for the ellipse too."""
+    radius = np.maximum(np.maximum(rx, ry), 1e-9)
+    tolerance = max(tolerance, 1e-6)
+    if mode == "polyline":
+        # Chord error of a step h is at most h^2 / 8 * max radius
+        step = np.sqrt(8 * tolerance / radius)
+    else:
+        # Cubic arc error ~ r * 4/27 * (h/4)^6 (small h), never over 90°
+        step = np.minimum(4 * (27 * tolerance / (4 * radius)) ** (1 / 6), math.pi / 2)
+    counts = np.maximum(np.ceil(np.abs(span) / step), 1).astype(int)
+    if mode == "polyline":
+        counts = np.maximum(counts, np.where(np.abs(span) >= 2 * math.pi - 1e-9, 8, 1))
+
+    # Segment k of arc i runs from t0 to t1
+    arc = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - first[arc]
+    h = span[arc] / counts[arc]
+    t0 = start[arc] + k * h
+    t1 = t0 + h
+    cos0, sin0, cos1, sin1 = np.cos(t0), np.sin(t0), np.cos(t1), np.sin(t1)
+
+    if mode == "polyline":
+        u = np.stack([cos0, cos1], axis=1)
+        v = np.stack([sin0, sin1], axis=1)
+    else:
+        a = 4 / 3 * np.tan(h / 4)
+        u = np.stack([cos0, cos0 - a * sin0, cos1 + a * sin1, cos1], axis=1)
+        v = np.stack([sin0, sin0 + a * cos0, sin1 - a * cos1, sin1], axis=1)
+
+    # Scale, rotate, move to the center; SVG y points down
+    u = u * rx[arc, None]
+    v = v * ry[arc, None]
+    cos_a = np.cos(angle)[arc, None]
+    sin_a = np.sin(angle)[arc, None]
+    xs = cx[arc, None] + u * cos_a - v * sin_a
+    ys = cy[arc, None] - (u * sin_a + v * cos_a)
+    xy = np.stack([xs, ys], axis=2)  # segment, control point, (x, y)
+
+    paths = []
+    closed = np.abs(span) >= 2 * math.pi - 1e-9
+    for i, (lo, n) in enumerate(zip(first.tolist(), counts.tolist())):
+        seg = xy[lo : lo + n]
+        if mode == "polyline":
+            coords = np.concatenate([seg[0, 0], seg[:, 1].ravel()])
+            d = ("M %.2f %.2f" + " L %.2f %.2f" * n) % tuple(coords.tolist())
+        else:
+            coords = np.concatenate([seg[0, 0], seg[:, 1:].ravel()])
+            d = ("M %.2f %.2f" + " C %.2f %.2f %.2f %.2f %.2f %.2f" * n) % tuple(coords.tolist())
+        paths.append(d + " Z" if closed[i] else d)
+    return paths
+
+
+class PDFExport(SVGExport):
+    """Vector PDF with the same traversal as SVGExport: each page is the SVG
+    drawScene would write, painted by QSvgRenderer into a QPdfWriter.
+    Pages are written one at a time, so a whole class set takes a single
+    pass and the memory of one page. osifont is registered with Qt once
+    and embedded once per document.
+
+    Needs a running QGuiApplication."""
+
+    _font_family = None  # osifont family, looked up once per process
+
+    def __init__(self, width=210, height=297, padding=20):
+        super().__init__(width, height, padding)
+        self.date = date.today().strftime("%d.%m.%Y")
+
+    def drawScene(self, objects, filename="output.pdf"):
+        """Draw scene and save it as a one-page PDF"""
+        self.drawPages([(objects, None)], filename)
+
+    def drawPages(self, pages, filename="output.pdf") -> int:
+        """Save (objects, settings) pairs as consecutive pages of one PDF.
+        settings (a project's settings, or None to keep the current ones)
+        supplies the title, work number and offset of that page. Returns
+        the number of pages written."""
+        self._register_font()
+        # QSvgRenderer ignores @font-face; it looks the family up in Qt's font
+        # database, under the name osifont was registered as
+        self.font_family = PDFExport._font_family or "osifont"
+        writer = QPdfWriter(filename)
+        writer.setPageSize(QPageSize(QSizeF(self.width, self.height), QPageSize.Unit.Millimeter))
+        writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+        writer.setResolution(1200)
+        writer.setCreator("Mongoose")
+        page_rect = QRectF(0, 0, writer.width(), writer.height())
+
+        painter = QPainter(writer)
+        count = 0
+        for objects, settings in pages:
+            if count:
+                writer.newPage()
+            if settings is not None:
+                self.apply_settings(settings)
+            self.svg_elements = []
+            self.drawAxis()
+            self.drawTemplate()
+            self.drawObjects(objects)
+            renderer = QSvgRenderer(QByteArray(self.get_svg_string().encode("utf-8")))
+            renderer.render(painter, page_rect)
+            count += 1
+        painter.end()
+        return count
+
+    def apply_settings(self, settings):
+        """Take the title, work number and offset from project settings"""
+        self.set_workname(settings.get("project_name", ""))
+        self.set_id_date(settings.get("work_number", ""), self.date)
+        # Project offset is in coordinate units; the export works in mm
+        self.set_offset(settings.get("offset_x", 0.0) * MM_PER_UNIT, settings.get("offset_y", 0.0) * MM_PER_UNIT)
+
+    def _register_font(self):
+        if PDFExport._font_family is None:
+            PDFExport._font_family = ""
+            font_path = self._find_osifont_path()
+            if font_path:
+                font_id = QFontDatabase.addApplicationFont(font_path)
+                families = QFontDatabase.applicationFontFamilies(font_id)
+                if families:
+                    PDFExport._font_family = families[0]
+
+
+def iter_project_pages(paths):
+    """Load .mgs files one after another and yield (objects, settings) for
+    each; the previous project is dropped before the next one loads."""
+    project = Project()
+    for path in paths:
+        try:
+            project.open(path)
+        except OSError as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        yield project.objects, project.settings
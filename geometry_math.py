@@ -4,15 +4,58 @@ from math import atan2, sqrt
 import numpy as np
 
 
-class Point:
-    def __init__(self, id: int, cords: tuple[float, float], name: str):
+class Shape:
+    """Base of the drawable objects. Changing any public attribute drops the
+    object's cached render record (render_geometry.record_of) and bumps its
+    revision, which records of objects built on it are checked against.
+    Shape.scene_rev counts such changes across all objects."""
+
+    _render = None
+    _rev = 0
+    scene_rev = 0
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name[0] != "_":
+            object.__setattr__(self, "_rev", self._rev + 1)
+            Shape.scene_rev += 1
+            if self._render is not None:
+                object.__setattr__(self, "_render", None)
+
+
+class Point(Shape):
+    def __init__(self, id: int, cords: tuple[float, float], name: str, projection: int | None = None):
         self.id = id
         self.x: float = -cords[0]
         self.y: float = cords[1]
         self.name: str = name
+        # 1 (ground plan) or 2 (elevation). Unless given, taken from the
+        # name's suffix ("A1", "A2"), which is how scripts name projections.
+        if projection is None and name[-1:] in ("1", "2"):
+            projection = int(name[-1])
+        self.projection: int | None = projection
+
+    @classmethod
+    def many(
+        cls, id: int, cords: np.ndarray, names: list[str], projection: int | None = None
+    ) -> list["Point"]:
+        """Points at the logical (x, y) rows of cords. Being new they have no
+        render record to drop, so the per-attribute bookkeeping of
+        __setattr__ is skipped; scene_rev is bumped once for all of them."""
+        points = []
+        for (x, y), name in zip(cords.tolist(), names):
+            point = object.__new__(cls)
+            if projection is None and name[-1:] in ("1", "2"):
+                point_projection = int(name[-1])
+            else:
+                point_projection = projection
+            point.__dict__.update(id=id, x=x, y=y, name=name, projection=point_projection)
+            points.append(point)
+        Shape.scene_rev += 1
+        return points
 
 
-class Line:
+class Line(Shape):
     def __init__(self, id: int, p1: Point, p2: Point, name: str):
         self.id = id
         self.p1: Point = p1
@@ -23,7 +66,7 @@ class Line:
         self.resize: tuple[float, float] = (0.0, 1.0)
 
 
-class Circle:
+class Circle(Shape):
     def __init__(
         self,
         id: int,
@@ -43,7 +86,7 @@ class Circle:
         self.style: str = "normal"
 
 
-class Ellipse:
+class Ellipse(Shape):
     def __init__(
         self,
         id: int,
@@ -83,12 +126,32 @@ class Ellipse:
                 self.b = abs(ly) if abs(ly) > 1e-12 else self.a * 0.5
         else:
             self.b = 0.0
-        
+
+        # Partial arc, as parametric angles (degrees) from the major axis
+        self.draw_from: float | None = None
+        self.draw_span: float | None = None
+        self.type: str = "construct"
+        self.style: str = "normal"
+
+
+class Polyline(Shape):
+    """Vertices joined one after another by straight segments - one object
+    for an outline that would otherwise take a Line per edge. A closed
+    polyline (a polygon) also joins the last vertex back to the first.
+
+    vertices is an (n, 2) array of logical coordinates. Assign a new array
+    rather than changing it in place, so the render record is rebuilt."""
+
+    def __init__(self, id: int, vertices, name: str, closed: bool = False):
+        self.id = id
+        self.vertices: np.ndarray = np.asarray(vertices, dtype=float).reshape(-1, 2)
+        self.name: str = name
+        self.closed: bool = closed
         self.type: str = "construct"
         self.style: str = "normal"
 
 
-class Plane:
+class Plane(Shape):
     def __init__(
         self, id: int, cords: tuple[float, float | str, float | str], name: str
     ):
@@ -159,6 +222,29 @@ def perpendicular_point_from_distance(
     return Point(id, (-px, py), name)
 
 
+def line_params(line: Line, cords: np.ndarray) -> np.ndarray:
+    """Where the (n, 2) logical points project onto the line, as
+    parameters t along p1 -> p2 (0 at p1, 1 at p2)"""
+    dx, dy = line.p2.x - line.p1.x, line.p2.y - line.p1.y
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return np.zeros(len(cords))
+    return ((cords[:, 0] - line.p1.x) * dx + (cords[:, 1] - line.p1.y) * dy) / length2
+
+
+def line_crossings(line: Line, knives: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Where the lines given as (k, 4) rows x1, y1, x2, y2 cross the line,
+    as parameters t along p1 -> p2, and which of them cross it at all
+    (parallel ones do not)"""
+    dx, dy = line.p2.x - line.p1.x, line.p2.y - line.p1.y
+    ex = knives[:, 2] - knives[:, 0]
+    ey = knives[:, 3] - knives[:, 1]
+    denom = dx * ey - dy * ex
+    crossing = denom != 0
+    t = ((knives[:, 0] - line.p1.x) * ey - (knives[:, 1] - line.p1.y) * ex) / np.where(crossing, denom, 1)
+    return t, crossing
+
+
 def intersect_line2line(id: int, line1: Line, line2: Line, name: str) -> Point | None:
     x1, y1 = line1.p1.x, line1.p1.y
     x2, y2 = line1.p2.x, line1.p2.y
@@ -296,30 +382,91 @@ def angle_to_horizontal(p1: Point, p2: Point):
     return atan2(dy, dx)
 
 
+def ellipse_local(ellipse: Ellipse, x: float, y: float) -> tuple[float, float]:
+    """(x, y) in the ellipse's own frame: centered, major axis along x"""
+    dx = x - ellipse.center.x
+    dy = y - ellipse.center.y
+    cos_a = math.cos(ellipse.angle)
+    sin_a = math.sin(ellipse.angle)
+    return dx * cos_a + dy * sin_a, -dx * sin_a + dy * cos_a
+
+
+def ellipse_param_of(ellipse: Ellipse, point: Point) -> float:
+    """Parametric angle (radians) of the ellipse point in the direction of `point`"""
+    lx, ly = ellipse_local(ellipse, point.x, point.y)
+    if ellipse.a <= 0 or ellipse.b <= 0:
+        return atan2(ly, lx)
+    return atan2(ly / ellipse.b, lx / ellipse.a)
+
+
+def nearest_ellipse_param(a: float, b: float, x: float, y: float) -> float:
+    """Parametric angle t of the point (a cos t, b sin t) closest to (x, y),
+    all in the ellipse's own frame.
+
+    Solved in the first quadrant (the nearest point lies in the same
+    quadrant as the query), where the stationarity condition
+        g(t) = (a² - b²) sin t cos t - a x sin t + b y cos t = 0
+    has a single root: g(0) >= 0 >= g(pi/2). Newton's method from
+    atan2(a y, b x) converges in a few steps; a step that would leave the
+    bracket is replaced by bisection, so it never diverges.
+
+    On an axis g(0) or g(pi/2) is itself 0, but that end is the farthest
+    point whenever the other stationary branch cos t = a x / (a² - b²)
+    (or sin t = b y / (b² - a²)) exists, so that branch is taken directly."""
+    px, py = abs(x), abs(y)
+    d = a * a - b * b
+    if py == 0 and a * px < d:
+        t = math.acos(a * px / d)
+        return atan2(math.copysign(math.sin(t), y), math.copysign(math.cos(t), x))
+    if px == 0 and b * py < -d:
+        t = math.asin(b * py / -d)
+        return atan2(math.copysign(math.sin(t), y), math.copysign(math.cos(t), x))
+    lo, hi = 0.0, math.pi / 2
+    t = atan2(a * py, b * px)
+    for _ in range(16):
+        c, s = math.cos(t), math.sin(t)
+        g = d * s * c - a * px * s + b * py * c
+        if abs(g) < 1e-12 * max(a, b, 1.0) ** 2:
+            break
+        if g > 0:
+            lo = t
+        else:
+            hi = t
+        dg = d * (c * c - s * s) - a * px * c - b * py * s
+        step = t - g / dg if dg != 0 else hi + 1
+        t_new = step if lo < step < hi else (lo + hi) / 2
+        if abs(t_new - t) < 1e-12:
+            t = t_new
+            break
+        t = t_new
+    return atan2(math.copysign(math.sin(t), y), math.copysign(math.cos(t), x))
+
+
 def measure_point2point_distance(p1: Point, p2: Point):
     dx = p2.x - p1.x
     dy = p2.y - p1.y
     return sqrt(dx**2 + dy**2)
 
 
-def generatePolygonPoints(
-    id: int, center: Point, start: Point, n: int
-) -> list[tuple[float, float]]:
-    cx, cy = center.x, center.y
-    sx, sy = start.x, start.y
+# Bulk point generators: logical coordinates of many points at once, as an
+# (n, 2) array of (x, y) rows.
+
+
+def regular_polygon(center: Point, start: Point, n: int) -> np.ndarray:
+    """Vertices of the regular n-gon around center whose first vertex is start"""
+    vx, vy = start.x - center.x, start.y - center.y
+    return circle_points(center.x, center.y, math.hypot(vx, vy), n, math.atan2(vy, vx))
 
-    # vector from center to start vertex
-    vx, vy = sx - cx, sy - cy
-    r = math.hypot(vx, vy)
-    theta0 = math.atan2(vy, vx)
 
-    angle_step = 2 * math.pi / n
-    vertices: list[tuple[float, float]] = []
+def circle_points(cx: float, cy: float, r: float, n: int, start: float = 0.0) -> np.ndarray:
+    """n points evenly spaced on a circle, counterclockwise from the angle
+    start (radians)"""
+    theta = start + np.arange(n) * (2 * math.pi / n)
+    return np.column_stack((cx + r * np.cos(theta), cy + r * np.sin(theta)))
 
-    for i in range(n):
-        theta = theta0 + i * angle_step
-        x = cx + r * math.cos(theta)
-        y = cy + r * math.sin(theta)
-        vertices.append((-x, y))
 
-    return vertices
+def grid_points(ox: float, oy: float, dx: float, dy: float, columns: int, rows: int) -> np.ndarray:
+    """A columns x rows grid from (ox, oy), row by row"""
+    xs = ox + np.arange(columns) * dx
+    ys = oy + np.arange(rows) * dy
+    return np.column_stack((np.tile(xs, rows), np.repeat(ys, columns)))
@@ -0,0 +1,336 @@
+import time
+from typing import override
+
+import numpy as np
+from PyQt6.QtCore import QPointF, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QMatrix4x4, QOffscreenSurface, QOpenGLContext, QPainter, QPen, QSurfaceFormat
+from PyQt6.QtOpenGL import (
+    QOpenGLBuffer,
+    QOpenGLShader,
+    QOpenGLShaderProgram,
+    QOpenGLVersionFunctionsFactory,
+    QOpenGLVersionProfile,
+)
+from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+
+from canvas import CanvasBase, dash_unit
+from geometry_math import Line, Point, Polyline
+
+# The canvas drawn by the GPU: every object is uploaded once per scene
+# revision into a single vertex buffer (sheet pixels, like the QPainter
+# canvas), so panning and zooming only change the matrix uniform. Plain
+# OpenGL 2.1 / GLSL 1.20, which Mesa's llvmpipe software rasterizer runs
+# too - e.g. headless with LIBGL_ALWAYS_SOFTWARE=1 under any compositor.
+
+GL_POINTS = 0x0000
+GL_LINES = 0x0001
+GL_FLOAT = 0x1406
+GL_BLEND = 0x0BE2
+GL_SRC_ALPHA = 0x0302
+GL_ONE = 0x0001
+GL_ONE_MINUS_SRC_ALPHA = 0x0303
+GL_POINT_SPRITE = 0x8861
+GL_MULTISAMPLE = 0x809D
+
+# Circles and ellipses are uploaded as polylines this close to the curve, in paper mm
+CURVE_TOLERANCE_MM = 0.01
+MAX_CURVE_SEGMENTS = 4096
+# Qt's dash patterns, see the fragment shader
+DASH_PATTERNS = {Qt.PenStyle.DashLine: 1.0, Qt.PenStyle.DashDotLine: 2.0}
+# x, y (sheet pixels, y down) and distance along the line or curve (sheet pixels)
+VERTEX_FLOATS = 3
+
+VERTEX_SHADER = """
+#version 120
+attribute vec2 a_pos;
+attribute float a_dist;
+uniform mat4 u_matrix;
+varying float v_dist;
+void main() {
+    v_dist = a_dist;
+    gl_Position = u_matrix * vec4(a_pos, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+uniform vec4 u_color;
+uniform float u_dash;       // 0 solid, 1 dash (4 on, 2 off), 2 dash-dot (4, 2, 1, 2)
+uniform float u_dash_unit;  // sheet pixels per dash length unit, see canvas.dash_unit
+uniform float u_round;      // 1 for points: cut the square sprite to a disc
+varying float v_dist;
+void main() {
+    if (u_round > 0.5 && length(gl_PointCoord - vec2(0.5)) > 0.5)
+        discard;
+    float u = v_dist / u_dash_unit;
+    if (u_dash > 0.5 && u_dash < 1.5 && mod(u, 6.0) > 4.0)
+        discard;
+    if (u_dash > 1.5) {
+        float m = mod(u, 9.0);
+        if ((m > 4.0 && m < 6.0) || m > 7.0)
+            discard;
+    }
+    gl_FragColor = u_color;
+}
+"""
+
+
+def opengl_available() -> bool:
+    """Whether an OpenGL 2.1 context can be created here (needs a QGuiApplication)"""
+    surface = QOffscreenSurface()
+    surface.create()
+    context = QOpenGLContext()
+    if not context.create() or not context.makeCurrent(surface):
+        return False
+    profile = QOpenGLVersionProfile()
+    profile.setVersion(2, 1)
+    ok = QOpenGLVersionFunctionsFactory.get(profile, context) is not None
+    context.doneCurrent()
+    return ok
+
+
+def arc_polyline(paper, tolerance: float) -> np.ndarray:
+    """(n, 2) points along a circle, ellipse or arc (paper units, y up),
+    no farther than tolerance from it"""
+    r = max(paper.rx, paper.ry, 1e-9)
+    step = min(np.sqrt(8 * tolerance / r), np.pi / 4)
+    if paper.is_closed:
+        start, span = 0.0, 2 * np.pi
+    else:
+        start, span = np.radians(paper.start), np.radians(paper.span)
+    n = int(min(max(np.ceil(span / step), 1), MAX_CURVE_SEGMENTS))
+    t = start + span * np.arange(n + 1) / n
+    ex = paper.rx * np.cos(t)
+    ey = paper.ry * np.sin(t)
+    cos_a = np.cos(paper.angle)
+    sin_a = np.sin(paper.angle)
+    return np.column_stack((paper.cx + ex * cos_a - ey * sin_a, paper.cy + ex * sin_a + ey * cos_a))
+
+
+def polyline_vertices(points: np.ndarray) -> np.ndarray:
+    """GL_LINES vertices (x, y, distance) of a polyline given in sheet pixels"""
+    lengths = np.hypot(*np.diff(points, axis=0).T)
+    dist = np.concatenate(([0.0], np.cumsum(lengths)))
+    # Each segment is its own pair of vertices
+    index = np.repeat(np.arange(len(points)), 2)[1:-1]
+    return np.column_stack((points[index], dist[index]))
+
+
+def segment_vertices(segments) -> np.ndarray:
+    """GL_LINES vertices (x, y, distance) of straight segments (x1, y1, x2, y2)"""
+    ends = np.array(segments, np.float64).reshape(-1, 2, 2)
+    lengths = np.hypot(*(ends[:, 1] - ends[:, 0]).T)
+    dist = np.column_stack((np.zeros(len(ends)), lengths))
+    return np.concatenate((ends, dist[:, :, None]), axis=2).reshape(-1, 3)
+
+
+class GLDrawingCanvas(CanvasBase, QOpenGLWidget):
+    """The canvas, drawn with OpenGL from vertex buffers"""
+
+    selection_changed = pyqtSignal(list)
+    resize_confirmed = pyqtSignal(str, float, float)
+    drag_started = pyqtSignal(str)
+    point_dragged = pyqtSignal(str, float, float)
+    drag_finished = pyqtSignal(str)
+
+    def __init__(self, objects, settings=None):
+        QOpenGLWidget.__init__(self)
+        self.setup_canvas(objects, settings)
+        surface_format = QSurfaceFormat()
+        surface_format.setVersion(2, 1)
+        surface_format.setSamples(4)
+        self.setFormat(surface_format)
+
+        self.gl = None
+        self.program: QOpenGLShaderProgram | None = None
+        self.vertex_buffer: QOpenGLBuffer | None = None
+        # Built by build_batches, uploaded to vertex_buffer by upload_batches
+        self.vertices = np.zeros((0, VERTEX_FLOATS), np.float32)
+        # (pen, GL_LINES or GL_POINTS, first vertex, vertex count)
+        self.draw_calls: list[tuple[QPen, int, int, int]] = []
+        # Object key -> (pen key, mode, first vertex, vertex count), to draw
+        # highlighted objects again from the same buffer
+        self.object_ranges: dict[str, tuple[tuple, int, int, int]] = {}
+        self.uploaded_key = None
+
+    @override
+    def initializeGL(self):
+        profile = QOpenGLVersionProfile()
+        profile.setVersion(2, 1)
+        self.gl = QOpenGLVersionFunctionsFactory.get(profile, self.context())
+        if self.gl is None:
+            print("OpenGL 2.1 is not available; the canvas will stay empty")
+            return
+        self.program = QOpenGLShaderProgram(self)
+        self.program.addShaderFromSourceCode(QOpenGLShader.ShaderTypeBit.Vertex, VERTEX_SHADER)
+        self.program.addShaderFromSourceCode(QOpenGLShader.ShaderTypeBit.Fragment, FRAGMENT_SHADER)
+        if not self.program.link():
+            print(f"Error linking canvas shaders: {self.program.log()}")
+            self.gl = None
+            return
+        self.vertex_buffer = QOpenGLBuffer(QOpenGLBuffer.Type.VertexBuffer)
+        self.vertex_buffer.create()
+        self.vertex_buffer.setUsagePattern(QOpenGLBuffer.UsagePattern.StaticDraw)
+        self.uploaded_key = None
+
+    @override
+    def paintGL(self):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.draw_sheet(painter)
+        if self.batch_key != self.scene_key():
+            self.build_batches()
+        if self.gl is not None:
+            to_widget = painter.transform()
+            painter.beginNativePainting()
+            self.draw_native(to_widget)
+            painter.endNativePainting()
+        self.draw_overlays(painter)
+        painter.end()
+        self.record_paint(started)
+
+    def build_batches(self):
+        """Lay out every visible object as vertices, grouped by pen: axes
+        first, then lines and curves, then points."""
+        segments: dict[tuple, list[tuple[str, tuple[float, float, float, float]]]] = {}
+        curves: dict[tuple, list[tuple[str, np.ndarray]]] = {}
+        points: dict[tuple, list[tuple[str, tuple[float, float]]]] = {}
+        axes: list[tuple[str, tuple, tuple[float, float, float, float]]] = []
+        self.label_batch = []
+        m = self.mm_to_px
+        for key, obj, record in self.visible_objects():
+            paper = record.paper
+            if isinstance(obj, Point):
+                points.setdefault(record.pen_key, []).append((key, (paper.x * m, -paper.y * m)))
+                self.label_batch.append((QPointF(paper.x * m, -paper.y * m), obj.name, key))
+            elif isinstance(obj, Line):
+                segment = (paper.x1 * m, -paper.y1 * m, paper.x2 * m, -paper.y2 * m)
+                if obj.name in ("org_x", "org_y"):
+                    axes.append((key, ("axis", obj.name, None), segment))
+                else:
+                    segments.setdefault(record.pen_key, []).append((key, segment))
+            elif isinstance(obj, Polyline):
+                polyline = paper.outline() * (m, -m)
+                curves.setdefault(record.pen_key, []).append((key, polyline_vertices(polyline)))
+            else:
+                polyline = arc_polyline(paper, CURVE_TOLERANCE_MM) * (m, -m)
+                curves.setdefault(record.pen_key, []).append((key, polyline_vertices(polyline)))
+
+        chunks: list[np.ndarray] = []
+        self.draw_calls = []
+        self.object_ranges = {}
+        first = 0
+
+        def add_call(pen_key, mode, block, keys, sizes):
+            # keys: the objects in block, with their vertex counts in sizes
+            nonlocal first
+            chunks.append(block)
+            self.draw_calls.append((self.pen_for(pen_key, False), mode, first, len(block)))
+            for key, size in zip(keys, sizes):
+                self.object_ranges[key] = (pen_key, mode, first, size)
+                first += size
+
+        for key, pen_key, segment in axes:
+            add_call(pen_key, GL_LINES, segment_vertices([segment]), [key], [2])
+        for pen_key in dict.fromkeys([*segments, *curves]):
+            keyed_segments = segments.get(pen_key, [])
+            keyed_curves = curves.get(pen_key, [])
+            blocks = [block for _, block in keyed_curves]
+            if keyed_segments:
+                blocks.insert(0, segment_vertices([segment for _, segment in keyed_segments]))
+            add_call(
+                pen_key,
+                GL_LINES,
+                np.concatenate(blocks),
+                [key for key, _ in keyed_segments] + [key for key, _ in keyed_curves],
+                [2] * len(keyed_segments) + [len(block) for _, block in keyed_curves],
+            )
+        for pen_key, keyed in points.items():
+            xy = np.array([pt for _, pt in keyed], np.float64)
+            add_call(pen_key, GL_POINTS, np.column_stack((xy, np.zeros(len(xy)))), [key for key, _ in keyed], [1] * len(keyed))
+        self.vertices = (
+            np.concatenate(chunks).astype(np.float32) if chunks else np.zeros((0, VERTEX_FLOATS), np.float32)
+        )
+        self.batch_key = self.scene_key()
+
+    def upload_batches(self):
+        self.vertex_buffer.bind()
+        data = self.vertices.tobytes()
+        self.vertex_buffer.allocate(data, len(data))
+        self.vertex_buffer.release()
+        self.uploaded_key = self.batch_key
+
+    def frame_calls(self):
+        """(pen, pen whose dashes to follow, mode, first vertex, vertex
+        count) to draw this frame: the batches, with the highlighted objects
+        drawn again over the lines and points with the hover pens. Those keep
+        the plain dashes, so they cover the plain ones beneath them."""
+        highlights = []
+        for key in self.highlighted():
+            if key in self.object_ranges:
+                pen_key, mode, first, count = self.object_ranges[key]
+                highlights.append((self.pen_for(pen_key, True), self.pen_for(pen_key, False), mode, first, count))
+        calls = [(pen, pen, mode, first, count) for pen, mode, first, count in self.draw_calls]
+        lines = [call for call in calls if call[2] == GL_LINES]
+        points = [call for call in calls if call[2] == GL_POINTS]
+        return [
+            *lines,
+            *(call for call in highlights if call[2] == GL_LINES),
+            *points,
+            *(call for call in highlights if call[2] == GL_POINTS),
+        ]
+
+    def draw_native(self, to_widget):
+        """Draw the vertex buffer; to_widget maps sheet pixels to the widget"""
+        if self.uploaded_key != self.batch_key:
+            self.upload_batches()
+        if not self.draw_calls:
+            return
+        gl = self.gl
+        matrix = QMatrix4x4()
+        matrix.ortho(0, self.width(), self.height(), 0, -1, 1)
+        matrix = matrix * QMatrix4x4(to_widget)
+        # Pen widths are in sheet pixels; GL wants device pixels
+        to_device = self.zoom * self.devicePixelRatioF()
+
+        gl.glEnable(GL_BLEND)
+        # Colour blends over the sheet; alpha must stay opaque, or the widget
+        # turns see-through wherever a faded line is drawn.
+        gl.glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+        gl.glEnable(GL_MULTISAMPLE)
+        gl.glEnable(GL_POINT_SPRITE)
+        self.program.bind()
+        self.vertex_buffer.bind()
+        stride = VERTEX_FLOATS * 4
+        pos = self.program.attributeLocation("a_pos")
+        dist = self.program.attributeLocation("a_dist")
+        self.program.enableAttributeArray(pos)
+        self.program.enableAttributeArray(dist)
+        self.program.setAttributeBuffer(pos, GL_FLOAT, 0, 2, stride)
+        self.program.setAttributeBuffer(dist, GL_FLOAT, 8, 1, stride)
+        self.program.setUniformValue("u_matrix", matrix)
+
+        for pen, dash_pen, mode, first, count in self.frame_calls():
+            width = pen.widthF()
+            color = QColor(pen.color())
+            if width * to_device <= 1 and width > 0:
+                # Like QPainter's cosmetic stroker, which draws pens at most a
+                # device pixel wide: one pixel, faded by the width.
+                color.setAlphaF(color.alphaF() * width * to_device)
+            self.program.setUniformValue("u_color", color)
+            self.program.setUniformValue("u_dash", DASH_PATTERNS.get(pen.style(), 0.0))
+            self.program.setUniformValue("u_dash_unit", dash_unit(dash_pen, to_device))
+            if mode == GL_POINTS:
+                self.program.setUniformValue("u_round", 1.0)
+                gl.glPointSize(max(width * to_device, 1.0))
+            else:
+                self.program.setUniformValue("u_round", 0.0)
+                gl.glLineWidth(max(width * to_device, 1.0))
+            gl.glDrawArrays(mode, first, count)
+
+        self.program.disableAttributeArray(pos)
+        self.program.disableAttributeArray(dist)
+        self.vertex_buffer.release()
+        self.program.release()
+        gl.glDisable(GL_POINT_SPRITE)
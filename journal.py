@@ -0,0 +1,187 @@
+import glob
+import json
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app_config import get_config_path
+
+
+def journal_path_for(file_path: str) -> str:
+    """Journal file for a saved project: a hidden file next to the .mgs."""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.journal")
+
+
+def _lock(path: str):
+    """Take the lock file next to a journal without waiting. Returns the open
+    file holding the lock, or None if another running session has it. The
+    OS drops the lock when its process dies, so a crashed session's
+    journal can be taken over."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(path + ".lock", "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def read_records(path: str) -> list[dict]:
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half-written.
+                    break
+    except OSError:
+        pass
+    return records
+
+
+class Journal:
+    """Append-only log of the edits made to a project since it was last saved.
+
+    The first record names the file contents the edits apply to (by hash);
+    every following record is one edit. Records are queued by the GUI thread
+    and written, flushed and fsynced in batches by a background thread, so
+    recording costs one queue put."""
+
+    def __init__(self, path: str, lock=None):
+        self.path = path
+        self.op_count = 0
+        self._lock = lock
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="mongoose-journal", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def untitled(cls) -> "Journal":
+        """A journal for an untitled project, in the config directory. Every
+        session has its own; one left behind by a crashed session (nobody
+        holds its lock) is taken over so its edits can be recovered."""
+        directory = os.path.dirname(get_config_path())
+        for path in sorted(glob.glob(os.path.join(directory, "untitled*.journal"))):
+            lock = _lock(path)
+            if lock is None:
+                continue
+            if len(read_records(path)) > 1:
+                return cls(path, lock)
+            # Nothing in it to recover
+            journal = cls(path, lock)
+            journal.close(delete=True)
+        path = os.path.join(directory, f"untitled-{uuid.uuid4().hex}.journal")
+        return cls(path, _lock(path))
+
+    def load(self, base_hash: str) -> list[dict]:
+        """Return the edits left over from a previous session if they apply
+        to the given file contents and keep appending after them; otherwise
+        start a fresh journal."""
+        records = read_records(self.path)
+        if len(records) > 1 and records[0].get("op") == "base" and records[0].get("hash") == base_hash:
+            self.op_count = len(records) - 1
+            self._queue.put(("append",))
+            return records[1:]
+        self.rebase(base_hash)
+        return []
+
+    def record(self, op: str, **data) -> None:
+        self.op_count += 1
+        self._queue.put(("record", op, data))
+
+    def rebase(self, base_hash: str, after: Future | None = None) -> None:
+        """Drop everything recorded so far: the file now holds those edits.
+        If `after` is given, truncation waits until that save has finished
+        (and is skipped if it failed) so no edit is lost in between."""
+        self.op_count = 0
+        self._queue.put(("rebase", base_hash, after))
+
+    def close(self, delete: bool = False) -> None:
+        self._queue.put(("close", delete))
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if not self._handle(item):
+                    return
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def _handle(self, item) -> bool:
+        kind = item[0]
+        try:
+            if kind == "record":
+                _, op, data = item
+                if self._file is None:
+                    self._file = self._open("a")
+                self._file.write(json.dumps({"op": op, **data}) + "\n")
+            elif kind == "rebase":
+                _, base_hash, after = item
+                if after is not None:
+                    try:
+                        after.result()
+                    except Exception:
+                        return True
+                if self._file is not None:
+                    self._file.close()
+                self._file = self._open("w")
+                self._file.write(json.dumps({"op": "base", "hash": base_hash}) + "\n")
+            elif kind == "append":
+                if self._file is None:
+                    self._file = self._open("a")
+            elif kind == "close":
+                _, delete = item
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                if delete:
+                    _remove(self.path)
+                if self._lock is not None:
+                    # A journal left for recovery keeps its lock file (the
+                    # lock itself goes with the handle). Windows cannot
+                    # remove a file that is still open.
+                    if delete and fcntl is not None:
+                        _remove(self._lock.name)
+                    self._lock.close()
+                    if delete and fcntl is None:
+                        _remove(self._lock.name)
+                return False
+        except OSError as e:
+            print(f"Journal write failed: {e}")
+        return True
+
+    def _open(self, mode: str):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return open(self.path, mode, encoding="utf-8")
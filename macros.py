@@ -0,0 +1,130 @@
+import ast
+from collections import ChainMap
+from typing import Any, Callable
+
+from evaluator import Evaluator, UnsafeExpressionError
+
+# A macro is a construction written once with `def` in a script and then
+# used like any other command:
+#     def trace(point, plane, name):
+#         parallel(point, "org_y", "org_x", name + "_a")
+#         createLine(point, name + "_a", name)
+#     trace("A1", "rho", "l1")
+# Parameters are usually names (strings) the body builds on or makes
+# names from. The body may only call commands (or other macros) and
+# assign local variables.
+
+Step = Callable[[int, dict, ChainMap, set], None]
+
+
+class Macro:
+    """A compiled `def`. The body is turned into a list of steps when the
+    definition runs; each step calls its command directly with arguments
+    compiled by the Evaluator. Calling the macro binds the parameters and
+    runs the steps - nothing is parsed or recorded per statement, and
+    everything it makes belongs to the calling statement (its id). The
+    strings passed to commands are collected in `reads`: names a body
+    builds (plane + "1") can only be known when it runs."""
+
+    def __init__(
+        self, name: str, params: list[str], defaults: list[Any], steps: list[Step], names: frozenset[str]
+    ):
+        self.name = name
+        self.params = params
+        self.defaults = defaults
+        self.steps = steps
+        # Names the body itself mentions (string literals, free variables),
+        # on top of whatever a call passes in.
+        self.names = names
+
+    def __call__(self, id: int, objects: dict, variables: dict, reads: set, *args) -> None:
+        required = len(self.params) - len(self.defaults)
+        if not required <= len(args) <= len(self.params):
+            raise TypeError(f"{self.name}() takes {len(self.params)} arguments ({len(args)} given)")
+        values = list(args) + self.defaults[len(args) - required:]
+        scope = ChainMap(dict(zip(self.params, values)), variables)
+        for step in self.steps:
+            step(id, objects, scope, reads)
+
+
+def compile_macro(
+    node: ast.FunctionDef,
+    evaluator: Evaluator,
+    commands: dict[str, Callable[..., Any]],
+    utilities: dict[str, Callable[..., Any]],
+    variables: dict[str, Any],
+) -> Macro:
+    """Compile a `def` statement. commands are called as f(id, objects,
+    *args), utilities (setStyle...) as f(objects, *args). Raises
+    UnsafeExpressionError for anything the body may not contain."""
+    arguments = node.args
+    if (
+        node.decorator_list
+        or arguments.vararg
+        or arguments.kwarg
+        or arguments.kwonlyargs
+        or arguments.posonlyargs
+    ):
+        raise UnsafeExpressionError(f"Macro '{node.name}' may only take plain parameters")
+    if node.name in commands or node.name in utilities:
+        raise UnsafeExpressionError(f"'{node.name}' is a built-in command")
+    params = [arg.arg for arg in arguments.args]
+    defaults = [evaluator.evaluate(default, variables) for default in arguments.defaults]
+
+    steps = []
+    local_names = set(params)
+    mentioned = set()
+    for statement in node.body:
+        match statement:
+            case ast.Expr(value=ast.Constant(value=str())):
+                continue  # docstring
+            case ast.Expr(value=ast.Call(func=ast.Name(id=name), args=args, keywords=[])):
+                steps.append(_call_step(name, [evaluator.compile(arg) for arg in args], commands, utilities))
+                value_nodes = args
+            case ast.Assign(targets=targets, value=value) if all(isinstance(t, ast.Name) for t in targets):
+                steps.append(_assign_step([t.id for t in targets], evaluator.compile(value)))
+                local_names.update(t.id for t in targets)
+                value_nodes = [value]
+            case _:
+                raise UnsafeExpressionError(
+                    f"'{ast.unparse(statement)}' is not allowed in a macro (only commands and assignments)"
+                )
+        for value_node in value_nodes:
+            for sub in ast.walk(value_node):
+                if isinstance(sub, ast.Constant) and isinstance(sub.value, str):
+                    mentioned.add(sub.value)
+                elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load) and sub.id not in local_names:
+                    mentioned.add(sub.id)
+    return Macro(node.name, params, defaults, steps, frozenset(mentioned))
+
+
+def _call_step(name, args, commands, utilities) -> Step:
+    def evaluate(scope, reads):
+        values = [arg(scope) for arg in args]
+        reads.update(value for value in values if isinstance(value, str))
+        return values
+
+    if name in commands:
+        command = commands[name]
+        return lambda id, objects, scope, reads: command(id, objects, *evaluate(scope, reads))
+    if name in utilities:
+        utility = utilities[name]
+        return lambda id, objects, scope, reads: utility(objects, *evaluate(scope, reads))
+
+    def call_macro(id, objects, scope, reads):
+        # Looked up when run, so a macro may use one defined after it.
+        macro = scope.get(name)
+        if not isinstance(macro, Macro):
+            raise NameError(f"Unknown command: {name}")
+        macro(id, objects, scope.parents, reads, *evaluate(scope, reads))
+
+    return call_macro
+
+
+def _assign_step(targets, value) -> Step:
+    def assign(id, objects, scope, reads):
+        result = value(scope)
+        for target in targets:
+            scope[target] = result
+
+    return assign
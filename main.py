@@ -2,7 +2,7 @@ import sys
 import os
 from datetime import date
 
-from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtCore import QPointF, Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import (
     QAbstractItemView,
@@ -23,7 +23,8 @@ from PyQt6.QtWidgets import (
 )
 
 from canvas import DrawingCanvas
-from geometry_math import Circle, Line, Point
+from gl_canvas import GLDrawingCanvas, opengl_available
+from geometry_math import Circle, Ellipse, Line, Point, Polyline
 from object_preview_widget import ObjectPreviewWidget
 from parameters_input_popup import (
     CreateCirclePopup,
@@ -38,13 +39,23 @@ from parameters_input_popup import (
 )
 from project import Project
 from app_config import load_config, save_config
-from export import SVGExport
+from export import PDFExport, SVGExport, iter_project_pages
+from raster_export import PAPER_SIZES_MM, RasterExport
 
 project = Project()
 app_cfg = load_config()
 
+# How often the edit journal is compacted into the .mgs file.
+AUTOSAVE_INTERVAL_MS = 60_000
+# While a large file loads, the canvas is repainted every this many statements.
+PROGRESSIVE_LOAD_STEP = 500
+
 
 class MainWindow(QMainWindow):
+    # Emitted from the file watcher thread; Qt queues it onto the GUI thread.
+    file_changed_externally = pyqtSignal(str)
+    save_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         central_widget = QWidget()
@@ -54,10 +65,19 @@ class MainWindow(QMainWindow):
         layout.setContentsMargins(0, 0, 0, 0)
         self.init_objects_panel()
         self.init_menubar()
-        self.canvas = DrawingCanvas(project.objects, project.settings)
+        self.canvas = self.make_canvas()
         layout.addWidget(self.canvas)
         self.canvas.selection_changed.connect(self.sync_list_selection)
         self.canvas.resize_confirmed.connect(self.handle_resize_confirmed)
+        self.canvas.drag_started.connect(self.handle_drag_started)
+        self.canvas.point_dragged.connect(self.handle_point_dragged)
+        self.canvas.drag_finished.connect(self.handle_drag_finished)
+        self.canvas.eval_time_source = lambda: project.last_eval_time
+        self.file_changed_externally.connect(self.handle_external_change)
+        self.save_failed.connect(self.handle_save_error)
+        project.document.on_save_error = self.save_failed.emit
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(project.autosave)
         self.input_field.clearFocus()
 
     def closeEvent(self, a0):
@@ -65,6 +85,10 @@ class MainWindow(QMainWindow):
             return
         if not self.maybe_save():
             a0.ignore()
+            return
+        project.document.unwatch()
+        project.document.wait_for_save()
+        project.close_journal()
         a0.accept()
 
     def keyPressEvent(self, a0):
@@ -201,15 +225,17 @@ class MainWindow(QMainWindow):
                     self.insert_object_to_sidepanel(element)
                     self.object_list.update()
                     self.canvas.update()
-        # --- setCircleDrawRange: D key (select 1 Circle + 2 Points) ---
+        # --- setCircleDrawRange / setEllipseDrawRange: D key (select 1 Circle or Ellipse + 2 Points) ---
         if a0.key() == Qt.Key.Key_D:
             sel = self.canvas.selected_objs
             circles = [k for k in sel if isinstance(project.objects.get(k), Circle)]
+            ellipses = [k for k in sel if isinstance(project.objects.get(k), Ellipse)]
             points = [k for k in sel if isinstance(project.objects.get(k), Point)]
-            if len(circles) == 1 and len(points) == 2:
+            if len(circles) + len(ellipses) == 1 and len(points) == 2:
+                command = "setCircleDrawRange" if circles else "setEllipseDrawRange"
                 project.push_state()
                 element = project.add_new_commands(
-                    f"setCircleDrawRange({repr(circles[0])}, {repr(points[0])}, {repr(points[1])})"
+                    f"{command}({repr((circles + ellipses)[0])}, {repr(points[0])}, {repr(points[1])})"
                 )
                 if element is not None:
                     self.insert_object_to_sidepanel(element)
@@ -306,7 +332,7 @@ class MainWindow(QMainWindow):
         # --- visibility: V key (select Lines/Circles to set type/style) ---
         if a0.key() == Qt.Key.Key_V:
             sel = self.canvas.selected_objs
-            itemsToStylize = [k for k in sel if isinstance(project.objects.get(k), (Line, Circle))]
+            itemsToStylize = [k for k in sel if isinstance(project.objects.get(k), (Line, Circle, Polyline))]
             
             if itemsToStylize:
                 # Use the style/type of the first item as default for the popup
@@ -339,57 +365,45 @@ class MainWindow(QMainWindow):
             points = [k for k in sel if isinstance(project.objects.get(k), Point)]
             
             if len(lines) >= 1 and (len(lines) > 1 or len(points) > 0):
-                project.push_state()
                 line_name = lines[0]
                 line_obj = project.objects[line_name]
-                from geometry_math import intersect_line2line, measure_point2point_distance
-                
-                valid_split_pts = []
-                cmd_str = []
-                
-                # 0. Hide the original line from UI and rendering instead of deleting it.
+                cuts = points + lines[1:]
+                from geometry_math import intersect_line2line
+
+                # Knives parallel to the line don't cut it
+                if not points and all(intersect_line2line(0, line_obj, project.objects[k], "temp") is None for k in lines[1:]):
+                    return
+                project.push_state()
+                # Read before setType below turns the line to 'none'
+                line_type, line_style = line_obj.type, line_obj.style
+
+                # Hide the original line from UI and rendering instead of deleting it.
                 # This guarantees that Redo / Undo mathematical intersections don't break
                 # for any dependent objects that relied on it before the split!
-                cmd_str.append(f"hideInUI({repr(line_name)})")
-                cmd_str.append(f"setType({repr(line_name)}, 'none')")
-                
-                # 1. Gather all explicitly selected points
-                for pt_name in points:
-                    dist = measure_point2point_distance(line_obj.p1, project.objects[pt_name])
-                    valid_split_pts.append((dist, pt_name))
-                
-                # 2. Gather intersections from all "knife" lines
-                for knife_name in lines[1:]:
-                    knife_obj = project.objects[knife_name]
-                    pt = intersect_line2line(0, line_obj, knife_obj, "temp")
-                    if pt is not None:
-                        dist = measure_point2point_distance(line_obj.p1, pt)
-                        valid_split_pts.append((dist, knife_name))
-                
-                if valid_split_pts:
-                    # Sort all cutting points (manual + line intersections) by distance from start
-                    valid_split_pts.sort(key=lambda x: x[0])
-                    
-                    segment_bounds = [line_obj.p1.name] + [v[1] for v in valid_split_pts] + [line_obj.p2.name]
-                    
-                    for i in range(len(segment_bounds) - 1):
-                        bound1 = segment_bounds[i]
-                        bound2 = segment_bounds[i+1]
-                        new_name = f"{line_name}_{i+1}"
-                        cmd_str.append(f"createSplitSegment({repr(line_name)}, {repr(bound1)}, {repr(bound2)}, {repr(new_name)})")
-                        
-                        if hasattr(line_obj, 'type') and line_obj.type != 'construct':
-                            cmd_str.append(f"setType({repr(new_name)}, {repr(line_obj.type)})")
-                        if hasattr(line_obj, 'style') and line_obj.style != 'normal':
-                            cmd_str.append(f"setStyle({repr(new_name)}, {repr(line_obj.style)})")
-
-                    project.add_new_commands("\n".join(cmd_str))
-                    self.set_objects_panel()
-                    self.canvas.selected_objs.clear()
-                    self.canvas.update()
+                cmd_str = [
+                    f"hideInUI({repr(line_name)})",
+                    f"setType({repr(line_name)}, 'none')",
+                    # Every cut is placed along the line in one statement
+                    f"splitLine({repr(line_name)}, {repr(cuts)}, {repr(line_name)})",
+                ]
+                element = project.add_new_commands("\n".join(cmd_str))
+
+                # The pieces keep the look of the line
+                if element is not None and element.cmd == "splitLine":
+                    pieces = [key for key, obj in project.objects.items() if isinstance(obj, Line) and obj.id == element.id]
+                    cmd_str = []
+                    for piece in pieces:
+                        if line_type != 'construct':
+                            cmd_str.append(f"setType({repr(piece)}, {repr(line_type)})")
+                        if line_style != 'normal':
+                            cmd_str.append(f"setStyle({repr(piece)}, {repr(line_style)})")
+                    if cmd_str:
+                        project.add_new_commands("\n".join(cmd_str))
+                self.set_objects_panel()
+                self.canvas.selected_objs.clear()
+                self.canvas.update()
 
         if a0.key() == Qt.Key.Key_Delete:
-            project.push_state()
             # Collect IDs from canvas selection
             ids = {project.objects[key].id for key in self.canvas.selected_objs if key in project.objects}
             # Collect IDs from side panel selection (important for deleting non-geometric commands like 'Hide')
@@ -399,8 +413,31 @@ class MainWindow(QMainWindow):
                     ids.add(item_id)
             
             if ids:
+                mode = self.ask_removal_mode(ids)
+                if mode is None:
+                    return
+                project.push_state()
                 for item_id in ids:
-                    project.remove_element(item_id)
+                    project.remove_element(item_id, mode)
+                self.set_objects_panel()
+                self.canvas.selected_objs.clear()
+                self.canvas.update()
+        # --- bake to fixed coordinates / unbake a baked group: B key ---
+        if a0.key() == Qt.Key.Key_B:
+            ids = {project.objects[key].id for key in self.canvas.selected_objs if key in project.objects}
+            for item in self.object_list.selectedItems():
+                item_id = item.data(Qt.ItemDataRole.UserRole)
+                if item_id is not None:
+                    ids.add(item_id)
+            groups = [el.id for el in project.history if el.id in ids and el.cmd == "baked" and el.args]
+            # Nothing to bake (only planes, say) makes no undo step
+            if groups or project.can_bake(ids):
+                project.push_state()
+                if groups:
+                    for group_id in groups:
+                        project.unbake(group_id)
+                else:
+                    project.bake(ids)
                 self.set_objects_panel()
                 self.canvas.selected_objs.clear()
                 self.canvas.update()
@@ -450,11 +487,24 @@ class MainWindow(QMainWindow):
         save_action.setShortcut("Ctrl+S")
         save_action.triggered.connect(self.file_save_triggered)
         file_menu.addAction(save_action)
+        self.watch_action = QAction("Watch File for Changes", self)
+        self.watch_action.setCheckable(True)
+        self.watch_action.toggled.connect(self.update_file_watch)
+        file_menu.addAction(self.watch_action)
         file_menu.addSeparator()
         export_action = QAction("Export SVG…", self)
         export_action.setShortcut("Ctrl+E")
         export_action.triggered.connect(self.file_export_triggered)
         file_menu.addAction(export_action)
+        export_png_action = QAction("Export PNG…", self)
+        export_png_action.triggered.connect(self.file_export_png_triggered)
+        file_menu.addAction(export_png_action)
+        export_pdf_action = QAction("Export PDF…", self)
+        export_pdf_action.triggered.connect(self.file_export_pdf_triggered)
+        file_menu.addAction(export_pdf_action)
+        export_pdf_batch_action = QAction("Export PDF from Files…", self)
+        export_pdf_batch_action.triggered.connect(self.file_export_pdf_batch_triggered)
+        file_menu.addAction(export_pdf_batch_action)
         file_menu.addSeparator()
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
@@ -471,6 +521,35 @@ class MainWindow(QMainWindow):
             proj_settings_action = QAction("Project Settings…", self)
             proj_settings_action.triggered.connect(self.project_settings_triggered)
             project_menu.addAction(proj_settings_action)
+            sweep_action = QAction("Sweep Variable…", self)
+            sweep_action.triggered.connect(self.sweep_variable_triggered)
+            project_menu.addAction(sweep_action)
+
+        view_menu = menubar.addMenu("&View")
+        if view_menu:
+            debug_overlay_action = QAction("Debug Overlay", self)
+            debug_overlay_action.setShortcut("F12")
+            debug_overlay_action.setCheckable(True)
+            debug_overlay_action.toggled.connect(self.debug_overlay_toggled)
+            view_menu.addAction(debug_overlay_action)
+            frame_times_action = QAction("Export Frame Times…", self)
+            frame_times_action.triggered.connect(self.export_frame_times_triggered)
+            view_menu.addAction(frame_times_action)
+
+    def debug_overlay_toggled(self, checked: bool):
+        self.canvas.debug_overlay = checked
+        self.canvas.update()
+
+    def export_frame_times_triggered(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Frame Times", "frame_times.csv", "CSV Files (*.csv)"
+        )
+        if not file_path:
+            return
+        try:
+            self.canvas.export_frame_histogram(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Frame Times", f"Could not write {file_path}:\n{e}")
 
     def file_new_triggered(self):
         if not self.maybe_save():
@@ -479,6 +558,7 @@ class MainWindow(QMainWindow):
         self.canvas.settings = project.settings
         self.set_objects_panel()
         self.canvas.update()
+        self.offer_recovery()
 
     def file_open_triggered(self):
         if not self.maybe_save():
@@ -489,9 +569,20 @@ class MainWindow(QMainWindow):
         )
 
         if file_path:
-            project.open(file_path)
-            self.canvas.settings = project.settings
+            self.open_project(file_path)
             self.set_objects_panel()
+            self.update_file_watch()
+            self.offer_recovery()
+
+    def open_project(self, file_path):
+        """Open a file, repainting as it loads so big drawings appear progressively."""
+        painted = 0
+        for count in project.open_iter(file_path):
+            if count - painted >= PROGRESSIVE_LOAD_STEP:
+                painted = count
+                self.canvas.settings = project.settings
+                self.canvas.repaint()
+        self.canvas.settings = project.settings
 
     def file_save_triggered(self):
         if project.document.file_path == "":
@@ -502,20 +593,88 @@ class MainWindow(QMainWindow):
                 if not file_path.endswith(".mgs"):
                     file_path += ".mgs"
                 project.document.file_path = file_path
-                project.save()
+                project.save(background=True)
+                self.update_file_watch()
                 return True
             else:
                 return False
         else:
-            project.save()
+            project.save(background=True)
             return True
 
+    def start_journal(self):
+        """Journal edits from now on and offer anything a crash left behind."""
+        project.enable_journal()
+        self.autosave_timer.start(AUTOSAVE_INTERVAL_MS)
+        self.offer_recovery()
+
+    def offer_recovery(self):
+        if not project.recoverable_ops:
+            return
+        ret = QMessageBox.question(
+            self,
+            "Recover Changes",
+            "Mongoose was not closed properly and has unsaved changes for this project.\n"
+            "Do you want to recover them?",
+        )
+        if ret == QMessageBox.StandardButton.Yes:
+            project.recover_journal()
+        else:
+            project.discard_recovery()
+        self.set_objects_panel()
+        self.canvas.update()
+
+    def update_file_watch(self):
+        if self.watch_action.isChecked() and project.document.file_path:
+            project.document.watch(self.file_changed_externally.emit)
+        else:
+            project.document.unwatch()
+
+    def handle_save_error(self, error: str):
+        QMessageBox.warning(
+            self,
+            "Save Failed",
+            f"Could not save {project.document.file_path}:\n{error}\n\n"
+            "Your changes are kept; save them somewhere else.",
+        )
+
+    def handle_external_change(self, text: str):
+        if project.is_dirty:
+            ret = QMessageBox.question(
+                self,
+                "File Changed",
+                "The file was changed by another program.\nReload it and lose your unsaved changes?",
+            )
+            if ret != QMessageBox.StandardButton.Yes:
+                return
+        if not project.reload(text):
+            return
+        # Keep the view; only drop selections whose objects no longer exist.
+        self.canvas.selected_objs[:] = [k for k in self.canvas.selected_objs if k in project.objects]
+        if self.canvas.hovered_obj not in project.objects:
+            self.canvas.hovered_obj = None
+        self.set_objects_panel()
+        self.canvas.update()
+
     def handle_resize_confirmed(self, line_key: str, r1: float, r2: float):
         """Called when the user clicks in resize mode to confirm a new line extent."""
         project.push_state()
         project.add_new_commands(f"setResize({repr(line_key)}, {r1}, {r2})")
         self.canvas.update()
 
+    def handle_drag_started(self, point_key: str):
+        # Only points placed with plain numeric coordinates can be dragged.
+        if not project.begin_drag(point_key):
+            self.canvas.cancel_drag()
+
+    def handle_point_dragged(self, point_key: str, x: float, y: float):
+        project.drag_to(x, y)
+
+    def handle_drag_finished(self, point_key: str):
+        if project.end_drag():
+            self.set_objects_panel()
+        self.canvas.update()
+
     def file_export_triggered(self):
         global app_cfg
         # --- Export popup: ask for project name ---
@@ -544,7 +703,6 @@ class MainWindow(QMainWindow):
         # Settings are now stored in project.settings
         project.settings["project_name"] = name_input.text().strip()
         project.settings["work_number"] = number_input.text().strip()
-        work_number = project.settings["work_number"]
         project.is_dirty = True
 
         # Ask where to save
@@ -563,13 +721,85 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
 
-        # Build SVG export
-        exporter = SVGExport()
-        exporter.set_workname(project.settings["project_name"])
+        exporter = self.make_exporter()
+        exporter.drawScene(project.objects, file_path)
+        QMessageBox.information(self, "Export", f"Exported to:\n{file_path}")
+
+    def file_export_png_triggered(self):
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Export PNG")
+        form = QFormLayout(dlg)
+
+        paper_combo = QComboBox()
+        paper_combo.addItems(list(PAPER_SIZES_MM))
+        form.addRow("Paper:", paper_combo)
+
+        dpi_combo = QComboBox()
+        dpi_combo.addItems(["150", "300", "600", "1200"])
+        dpi_combo.setCurrentText("300")
+        form.addRow("DPI:", dpi_combo)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(dlg.accept)
+        buttons.rejected.connect(dlg.reject)
+        form.addRow(buttons)
+
+        if dlg.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        default_full_path = "output.png"
+        if project.document.file_path:
+            default_full_path = os.path.splitext(project.document.file_path)[0] + ".png"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export PNG", default_full_path, "PNG Files (*.png)"
+        )
+        if not file_path:
+            return
+
+        exporter = RasterExport(int(dpi_combo.currentText()), paper_combo.currentText())
+        exporter.set_offset(project.settings.get("offset_x", 0.0), project.settings.get("offset_y", 0.0))
+        exporter.drawScene(project.objects, file_path)
+        QMessageBox.information(self, "Export", f"Exported to:\n{file_path}")
+
+    def file_export_pdf_triggered(self):
+        default_full_path = "output.pdf"
+        if project.document.file_path:
+            default_full_path = os.path.splitext(project.document.file_path)[0] + ".pdf"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export PDF", default_full_path, "PDF Files (*.pdf)"
+        )
+        if not file_path:
+            return
+        self.make_exporter(PDFExport).drawScene(project.objects, file_path)
+        QMessageBox.information(self, "Export", f"Exported to:\n{file_path}")
+
+    def file_export_pdf_batch_triggered(self):
+        """Put several projects into one PDF, one page each, in file order."""
+        default_dir = os.path.dirname(project.document.file_path) if project.document.file_path else ""
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Projects to Export", default_dir, "Mongoose Files (*.mgs)"
+        )
+        if not paths:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export PDF", os.path.join(default_dir, "output.pdf"), "PDF Files (*.pdf)"
+        )
+        if not file_path:
+            return
+        count = self.make_exporter(PDFExport).drawPages(iter_project_pages(sorted(paths)), file_path)
+        QMessageBox.information(self, "Export", f"Exported {count} pages to:\n{file_path}")
+
+    def make_exporter(self, exporter_class=SVGExport) -> SVGExport:
+        """Exporter set up from the project and app settings."""
+        exporter = exporter_class()
+        exporter.set_workname(project.settings.get("project_name", ""))
 
         lastname = app_cfg.get("me", "lastname", fallback="Lastname")
         class_name = app_cfg.get("me", "class", fallback="4.X")
         exporter.set_lastname(lastname, class_name)
+        work_number = project.settings.get("work_number", "")
         exporter.set_id_date(work_number, date.today().strftime("%d.%m.%Y"))
 
         # Apply project offset to export (convert units to mm)
@@ -583,8 +813,72 @@ class MainWindow(QMainWindow):
         hidden_style = app_cfg.get("export", "hiddenlines_style", fallback="normal")
         exporter.set_hidden_lines_style(hidden_style)
 
-        exporter.drawScene(project.objects, file_path)
-        QMessageBox.information(self, "Export", f"Exported to:\n{file_path}")
+        curves = app_cfg.get("export", "curves", fallback="native")
+        tolerance = app_cfg.getfloat("export", "curve_tolerance", fallback=0.01)
+        exporter.set_curve_mode(curves, tolerance)
+        return exporter
+
+    def sweep_variable_triggered(self):
+        variables = project.numeric_variables()
+        if not variables:
+            QMessageBox.information(self, "Sweep Variable", "The script has no numeric variables.")
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Sweep Variable")
+        form = QFormLayout(dlg)
+
+        variable_combo = QComboBox()
+        variable_combo.addItems(variables)
+        form.addRow("Variable:", variable_combo)
+
+        start_input = QLineEdit()
+        form.addRow("From:", start_input)
+        stop_input = QLineEdit()
+        form.addRow("To:", stop_input)
+        steps_input = QLineEdit("10")
+        form.addRow("Frames:", steps_input)
+
+        def fill_range():
+            value = project.variables.get(variable_combo.currentText(), 0)
+            start_input.setText(str(value))
+            stop_input.setText(str(value * 2 if value else 1))
+
+        variable_combo.currentTextChanged.connect(fill_range)
+        fill_range()
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(dlg.accept)
+        buttons.rejected.connect(dlg.reject)
+        form.addRow(buttons)
+
+        if dlg.exec() != QDialog.DialogCode.Accepted:
+            return
+        try:
+            start = float(start_input.text())
+            stop = float(stop_input.text())
+            steps = int(steps_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Sweep Variable", "From, To and Frames must be numbers.")
+            return
+        if steps < 1:
+            return
+
+        default_dir = os.path.dirname(project.document.file_path) if project.document.file_path else ""
+        out_dir = QFileDialog.getExistingDirectory(self, "Export Frames To", default_dir)
+        if not out_dir:
+            return
+
+        name = variable_combo.currentText()
+        if steps == 1:
+            values = [start]
+        else:
+            values = [start + (stop - start) * i / (steps - 1) for i in range(steps)]
+        pattern = os.path.join(out_dir, f"{name}_{{index:03d}}.svg")
+        files = self.make_exporter().drawFrames(project.sweep(name, values), pattern)
+        self.canvas.update()
+        QMessageBox.information(self, "Sweep Variable", f"Exported {len(files)} frames to:\n{out_dir}")
 
     def edit_settings_triggered(self):
         global app_cfg
@@ -616,6 +910,25 @@ class MainWindow(QMainWindow):
             hidden_combo.setCurrentIndex(idx)
         form.addRow("Hidden lines:", hidden_combo)
 
+        curves_combo = QComboBox()
+        curves_combo.addItems(["native", "bezier", "polyline"])
+        current_curves = app_cfg.get("export", "curves", fallback="native")
+        idx = curves_combo.findText(current_curves)
+        if idx >= 0:
+            curves_combo.setCurrentIndex(idx)
+        form.addRow("Curves:", curves_combo)
+
+        tolerance_input = QLineEdit(app_cfg.get("export", "curve_tolerance", fallback="0.01"))
+        form.addRow("Curve tolerance (mm):", tolerance_input)
+
+        # --- [view] section ---
+        canvas_combo = QComboBox()
+        canvas_combo.addItems(["raster", "opengl"])
+        idx = canvas_combo.findText(app_cfg.get("view", "canvas", fallback="raster"))
+        if idx >= 0:
+            canvas_combo.setCurrentIndex(idx)
+        form.addRow("Canvas (on restart):", canvas_combo)
+
         buttons = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
         )
@@ -636,6 +949,15 @@ class MainWindow(QMainWindow):
             app_cfg.add_section("export")
         app_cfg.set("export", "point_style", point_style_combo.currentText())
         app_cfg.set("export", "hiddenlines_style", hidden_combo.currentText())
+        app_cfg.set("export", "curves", curves_combo.currentText())
+        try:
+            app_cfg.set("export", "curve_tolerance", str(float(tolerance_input.text())))
+        except ValueError:
+            pass
+
+        if not app_cfg.has_section("view"):
+            app_cfg.add_section("view")
+        app_cfg.set("view", "canvas", canvas_combo.currentText())
 
         save_config(app_cfg)
         QMessageBox.information(self, "Settings", "Settings saved.")
@@ -675,7 +997,34 @@ class MainWindow(QMainWindow):
             project.is_dirty = True
             self.canvas.update()
 
+    def ask_removal_mode(self, ids) -> str | None:
+        """"cascade" or "freeze" for what is built on the objects being
+        deleted, or None if the user cancelled."""
+        dependents = {el.id: el for item_id in ids for el in project.removal_dependents(item_id)}
+        for item_id in ids:
+            dependents.pop(item_id, None)
+        if not dependents:
+            return "cascade"
+        names = ", ".join(el.content.name for el in list(dependents.values())[:8])
+        if len(dependents) > 8:
+            names += ", ..."
+        box = QMessageBox(self)
+        box.setWindowTitle("Delete")
+        box.setText(f"{len(dependents)} other object(s) are built on what you are deleting:\n{names}")
+        box.setInformativeText("Delete them too, or keep them as fixed objects where they are now?")
+        cascade = box.addButton("Delete All", QMessageBox.ButtonRole.DestructiveRole)
+        freeze = box.addButton("Keep as Fixed", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton(QMessageBox.StandardButton.Cancel)
+        box.exec()
+        if box.clickedButton() is cascade:
+            return "cascade"
+        if box.clickedButton() is freeze:
+            return "freeze"
+        return None
+
     def maybe_save(self) -> bool:
+        # A save still being written only counts once it has succeeded
+        project.document.wait_for_save()
         if not project.is_dirty:
             return True
 
@@ -689,13 +1038,25 @@ class MainWindow(QMainWindow):
         )
 
         if ret == QMessageBox.StandardButton.Save:
-            return self.file_save_triggered()
+            if not self.file_save_triggered():
+                return False
+            # Go on only once the edits are on disk
+            project.document.wait_for_save()
+            return not project.document.save_failed
 
         if ret == QMessageBox.StandardButton.Cancel:
             return False
 
         return True
 
+    def make_canvas(self):
+        """The canvas chosen in Settings: raster (QPainter) or OpenGL"""
+        if app_cfg.get("view", "canvas", fallback="raster") == "opengl":
+            if opengl_available():
+                return GLDrawingCanvas(project.objects, project.settings)
+            print("OpenGL is not available, using the raster canvas")
+        return DrawingCanvas(project.objects, project.settings)
+
     def init_objects_panel(self):
         self.dock = QDockWidget("Objects", self)
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.dock)
@@ -938,9 +1299,11 @@ class MainWindow(QMainWindow):
 
     def load_project(self, file_path):
         if os.path.exists(file_path):
-            project.open(file_path)
+            self.open_project(file_path)
             self.set_objects_panel()
+            self.update_file_watch()
             self.canvas.update()
+            self.offer_recovery()
 
 
 if __name__ == "__main__":
@@ -952,6 +1315,7 @@ if __name__ == "__main__":
         file_to_open = sys.argv[1]
         if file_to_open.endswith(".mgs"):
             window.load_project(file_to_open)
-            
+
+    window.start_journal()
     window.show()
     sys.exit(app.exec())
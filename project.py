@@ -1,11 +1,44 @@
 import ast
-import math
-from typing import Any
+import codeop
+import difflib
+import functools
+import heapq
+import inspect
+import json
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Iterable, Iterator
+
+import numpy as np
 
 import create_objects
 from document import Document
-from geometry_math import Circle, Line, Plane, Point
+from evaluator import Evaluator
+from geometry_math import Circle, Line, Plane, Point, Polyline
+from journal import Journal, journal_path_for
+from macros import Macro, compile_macro
 from object_preview_widget import ObjectPreviewType, ObjectTypes
+from symbols import SymbolTable
+
+# Dragged point coordinates are rounded to this many decimals.
+DRAG_PRECISION = 2
+# Coordinates of objects frozen by remove_element, likewise.
+FREEZE_PRECISION = 6
+
+
+def _timed_edit(method):
+    """Keep how long the edit took (evaluation included) in last_eval_time."""
+
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.last_eval_time = time.perf_counter() - started
+
+    return timed
 
 
 class Element:
@@ -17,6 +50,7 @@ class Element:
         content: ObjectPreviewType,
         source: str,
         show_in_ui: bool = True,
+        node: ast.stmt | None = None,
     ):
         self.id = id
         self.cmd = cmd
@@ -24,17 +58,85 @@ class Element:
         self.content = content
         self.source = source
         self.show_in_ui = show_in_ui
+        self.node = node
+        # Names (objects and variables) this element read and wrote when it
+        # last ran, as Project.symbols handles. Used to re-evaluate only
+        # what depends on a change.
+        self.inputs: set[int] = set()
+        self.outputs: set[int] = set()
+
+
+# Script commands: the public functions defined in create_objects (not the
+# geometry helpers it imports).
+COMMANDS = {
+    name: func
+    for name, func in vars(create_objects).items()
+    if inspect.isfunction(func) and func.__module__ == create_objects.__name__ and not name.startswith("_")
+}
+
+
+_MISSING = object()
+
+
+class ObjectStore(dict):
+    """The objects dict shared with the canvas. While recording, it remembers
+    which keys were (re)assigned - as symbol handles - so commands don't
+    have to report them, and what they held before, so a command that fails
+    halfway can be undone (see rollback)."""
+
+    def __init__(self, symbols: SymbolTable, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.symbols = symbols
+        self.written: set[int] | None = None
+        self._previous: dict[str, Any] = {}
+
+    def record(self) -> None:
+        self.written = set()
+        self._previous = {}
+
+    def __setitem__(self, key, value):
+        if self.written is not None:
+            self.written.add(self.symbols.intern(key))
+            self._previous.setdefault(key, self.get(key, _MISSING))
+        super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        other = dict(*args, **kwargs)
+        if self.written is not None:
+            self.written |= self.symbols.intern_all(other)
+            for key in other:
+                self._previous.setdefault(key, self.get(key, _MISSING))
+        super().update(other)
+
+    def rollback(self) -> None:
+        """Put back what the keys written while recording held before."""
+        for key, value in self._previous.items():
+            if value is _MISSING:
+                super().pop(key, None)
+            else:
+                super().__setitem__(key, value)
+        self._previous = {}
 
 
 class Project:
     def __init__(self):
         self.document = Document()
         self.history: list[Element] = []
+        # Reverse dependency index: symbol handle -> the elements that read
+        # or write it. Kept up to date as elements run and are removed.
+        self._users: dict[int, set[Element]] = {}
+        # Position in history by element id; None once history is reordered.
+        self._positions: dict[int, int] | None = {}
         self.undo_stack: list[str] = []
         self.redo_stack: list[str] = []
-        self.objects: dict[str, Point | Line | Circle | Plane] = {}
+        self.symbols = SymbolTable()
+        self.objects: dict[str, Point | Line | Circle | Plane] = ObjectStore(self.symbols)
         self.variables = {}
         self.next_id = 2
+        # Edits so far, and the background save in flight with the count it
+        # saved (see is_dirty)
+        self._edits = 0
+        self._saving: tuple[Future, int] | None = None
         self.is_dirty = False
         self.settings = {
             "project_name": "",
@@ -42,38 +144,98 @@ class Project:
             "offset_x": 0.0,
             "offset_y": 0.0
         }
+        self.journal: Journal | None = None
+        self.journaling = False
+        self.recoverable_ops: list[dict] = []
+        self._replaying = False
+        self._drag: tuple[Element, int, list[Element], str] | None = None
+        # Seconds the last edit took to evaluate (see _timed_edit)
+        self.last_eval_time: float | None = None
+        # Per-node results that never change, so re-running a statement
+        # (reload, sweep, drag) skips unparsing and walking it again.
+        self._node_sources: weakref.WeakKeyDictionary[ast.stmt, str] = weakref.WeakKeyDictionary()
+        self._node_names: weakref.WeakKeyDictionary[ast.stmt, frozenset[int]] = weakref.WeakKeyDictionary()
         self.objects["org_x"] = create_objects.org_x
         self.objects["org_y"] = create_objects.org_y
+        self.safe_globals = self._make_safe_globals()
+        self.evaluator = Evaluator(
+            functions={
+                "getObject": lambda name: create_objects.getObject(self.objects, name),
+                "measureDistance": lambda obj1, obj2=None: create_objects.measureDistance(
+                    self.objects, obj1, obj2
+                ),
+            },
+            constants={"org_x": create_objects.org_x, "org_y": create_objects.org_y},
+        )
 
     def open(self, filepath):
-        self.new()
-        self.document.open(filepath)
-        if self.document.file is None:
-            return
-        # Parse settings from magic comments
-        lines = self.document.file.split("\n")
-        script_lines = []
-        import json
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith("# settings ="):
-                try:
-                    data = json.loads(stripped[len("# settings ="):].strip())
-                    self.settings.update(data)
-                except:
-                    pass
-            elif stripped.startswith("# project_name:"):
-                self.settings["project_name"] = stripped[len("# project_name:"):].strip()
-            elif stripped.startswith("# work_number:"):
-                self.settings["work_number"] = stripped[len("# work_number:"):].strip()
-            else:
-                script_lines.append(line)
-        self.add_new_commands("\n".join(script_lines))
+        for _ in self.open_iter(filepath):
+            pass
+
+    def open_iter(self, filepath) -> Iterator[int]:
+        """Load a file in a single pass: lines are streamed from disk, the
+        settings header is picked out as it goes by, and each statement is
+        executed as soon as it is complete. Yields the number of history
+        elements after every statement so callers can show progress."""
+        # The journal is only opened once the file is in, for that file.
+        self._reset()
+        buffer: list[str] = []
+        for line in self.document.open_lines(filepath):
+            if line.lstrip().startswith("#"):
+                header = parse_header_line(line.strip())
+                if header is not None:
+                    self.settings.update(header)
+                    continue
+            if not buffer and line.isspace():
+                continue
+            buffer.append(line)
+            nodes = self._complete_statement(buffer, at_eof=False)
+            if nodes is None:
+                continue
+            buffer.clear()
+            for node in nodes:
+                self._append(node)
+                yield len(self.history)
+        if buffer:
+            for node in self._complete_statement(buffer, at_eof=True) or []:
+                self._append(node)
         self.is_dirty = False
         self.undo_stack.clear()
         self.redo_stack.clear()
+        if self.journaling:
+            self._open_journal()
+        yield len(self.history)
+
+    def _complete_statement(self, buffer: list[str], at_eof: bool) -> list[ast.stmt] | None:
+        """Parse the buffered lines. Returns the statements, or None while a
+        multi-line statement is still open. A broken statement is reported
+        and dropped (the rest of the file still loads)."""
+        source = "".join(buffer)
+        try:
+            nodes = ast.parse(source).body
+        except SyntaxError as e:
+            error = e
+        else:
+            # A def is only over once a line outside it follows (its body
+            # may go on after a blank line).
+            if not at_eof and nodes and isinstance(nodes[-1], ast.FunctionDef):
+                return None
+            return nodes
+        if not at_eof:
+            try:
+                if codeop.compile_command(source, "<mgs>", "exec") is None:
+                    return None
+            except (SyntaxError, ValueError, OverflowError):
+                pass
+        print(f"Syntax error in script: {error}")
+        return []
 
     def new(self):
+        self._reset()
+        if self.journaling:
+            self._open_journal()
+
+    def _reset(self):
         self.is_dirty = False
         self.settings = {
             "project_name": "",
@@ -82,7 +244,7 @@ class Project:
             "offset_y": 0.0
         }
         self.document.new()
-        self.history.clear()
+        self._clear_history()
         self.undo_stack.clear()
         self.redo_stack.clear()
         self.objects.clear()
@@ -92,6 +254,7 @@ class Project:
         self.next_id = 2
 
     def push_state(self):
+        self._journal("push")
         self.undo_stack.append(self.get_script())
         self.redo_stack.clear()
 
@@ -102,18 +265,22 @@ class Project:
                 script_lines.append(el.source)
         return "\n".join(script_lines)
 
+    @_timed_edit
     def undo(self):
         if not self.undo_stack:
             return False
+        self._journal("undo")
         current = self.get_script()
         self.redo_stack.append(current)
         prev = self.undo_stack.pop()
         self._load_from_script(prev)
         return True
 
+    @_timed_edit
     def redo(self):
         if not self.redo_stack:
             return False
+        self._journal("redo")
         current = self.get_script()
         self.undo_stack.append(current)
         nxt = self.redo_stack.pop()
@@ -121,18 +288,23 @@ class Project:
         return True
 
     def _load_from_script(self, script: str):
-        self.history.clear()
+        self._clear_history()
         self.objects.clear()
         self.variables.clear()
         self.objects["org_x"] = create_objects.org_x
         self.objects["org_y"] = create_objects.org_y
         self.next_id = 2
         if script.strip():
-            self.add_new_commands(script)
+            self._run_script(script)
         self.is_dirty = True
 
 
+    @_timed_edit
     def add_new_commands(self, script: str):
+        self._journal("commands", script=script)
+        return self._run_script(script)
+
+    def _run_script(self, script: str):
         self.is_dirty = True
         try:
             tree = ast.parse(script)
@@ -141,93 +313,445 @@ class Project:
             return None
 
         last_element = None
-        safe_globals = {
-            "math": math,
-            "org_x": create_objects.org_x,
-            "org_y": create_objects.org_y,
-            "getObject": lambda name: create_objects.getObject(self.objects, name),
-            "measureDistance": lambda obj1, obj2=None: create_objects.measureDistance(
-                self.objects, obj1, obj2
-            ),
+        for node in tree.body:
+            element = self._append(node)
+            if element is not None and element.show_in_ui:
+                last_element = element
+        return last_element
+
+    def _append(self, node: ast.stmt) -> Element | None:
+        id = self.next_id
+        self.next_id += 1
+        element = self._execute(node, id)
+        if element is not None:
+            self.history.append(element)
+            self._index(element)
+            if self._positions is not None:
+                self._positions[element.id] = len(self.history) - 1
+        return element
+
+    def _clear_history(self) -> None:
+        self.history.clear()
+        self._users.clear()
+        self._positions = {}
+
+    def _index(self, el: Element) -> None:
+        for handle in el.inputs | el.outputs:
+            self._users.setdefault(handle, set()).add(el)
+
+    def _unindex(self, el: Element) -> None:
+        for handle in el.inputs | el.outputs:
+            users = self._users.get(handle)
+            if users is not None:
+                users.discard(el)
+
+    def _position_of(self, el: Element) -> int:
+        if self._positions is None:
+            self._positions = {e.id: i for i, e in enumerate(self.history)}
+        return self._positions[el.id]
+
+    def _make_safe_globals(self) -> dict[str, Any]:
+        """Utility commands that act on objects without creating any."""
+        return {
             "setType": create_objects.setType,
             "setStyle": create_objects.setStyle,
             "setResize": create_objects.setResize,
             "setVisibilities": create_objects.setVisibilities,
             "hideInUI": lambda objects, name: None,
+            # A construction kept by Project.bake; never evaluated.
+            "baked": lambda objects, group: None,
             "hideObject": lambda objects, name: setattr(objects[name], "hidden", True) if name in objects else None,
         }
 
-        for node in tree.body:
-            id = self.next_id
-            self.next_id += 1
-            line_source = ast.unparse(node)
-            if isinstance(node, ast.Assign):
-                try:
-                    value_str = ast.unparse(node.value)
-                    value = eval(value_str, safe_globals, self.variables)
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            self.variables[target.id] = value
-                    element = Element(
-                        id,
-                        "ASSIGN",
-                        [],
-                        ObjectPreviewType(
-                            line_source, ObjectTypes.VARIABLE, "", "", ""
-                        ),
-                        line_source,
-                    )
-                    self.history.append(element)
-                    last_element = element
-                except Exception as e:
-                    print(f"Failed to assign variable: {e}")
-            elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
-                func_name = node.value.func.id
-                show_in_ui = True
-                try:
-                    args = []
-                    for arg_node in node.value.args:
-                        arg_str = ast.unparse(arg_node)
-                        arg_val = eval(arg_str, safe_globals, self.variables)
-                        args.append(arg_val)
-                    if func_name in safe_globals:
-                        if func_name == "hideInUI" and args:
-                            target_name = args[0]
-                            for el in self.history:
-                                if el.cmd.startswith("create") and el.args and el.args[-1] == target_name:
-                                    el.show_in_ui = False
-                        else:
-                            func = safe_globals[func_name]
-                            func(self.objects, *args)
-                        
-                        # Only hide utility commands from the UI
-                        if func_name in ("setType", "setStyle", "setVisibilities", "hideInUI", "setResize"):
-                            show_in_ui = False
-                    elif hasattr(create_objects, func_name):
-                        func = getattr(create_objects, func_name)
-                        func(id, self.objects, *args)
-                        if args and isinstance(args[-1], str) and args[-1].startswith("_"):
-                            show_in_ui = False
-                    else:
-                        print(f"Unknown command: {func_name}")
+    def _execute(self, node: ast.stmt, id: int) -> Element | None:
+        """Run one parsed statement and return its history element, or None
+        if it failed or is not a command."""
+        inputs = self._referenced_names(node)
+        self.objects.record()
+        try:
+            element = self._run_node(node, id)
+        finally:
+            written = self.objects.written
+            self.objects.written = None
+        if element is None:
+            # A command that failed halfway (a macro, say) leaves nothing behind
+            self.objects.rollback()
+            return None
+        if element.cmd not in ("ASSIGN", "MACRO"):
+            element.outputs = written
+        element.inputs = (inputs | element.inputs) - element.outputs
+        return element
+
+    def _run_node(self, node: ast.stmt, id: int) -> Element | None:
+        safe_globals = self.safe_globals
+        line_source = self._source_of(node)
+        if isinstance(node, ast.Assign):
+            try:
+                value = self.evaluator.evaluate(node.value, self.variables)
+                targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
+                for target in targets:
+                    self.variables[target] = value
+            except Exception as e:
+                print(f"Failed to assign variable: {e}")
+                return None
+            element = Element(
+                id,
+                "ASSIGN",
+                [],
+                ObjectPreviewType(line_source, ObjectTypes.VARIABLE, "", "", ""),
+                line_source,
+                node=node,
+            )
+            element.outputs = self.symbols.intern_all(targets)
+            return element
+        if isinstance(node, ast.FunctionDef):
+            return self._define_macro(node, id, line_source)
+        if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)):
+            return None
+        func_name = getattr(node.value.func, "id", ast.unparse(node.value.func))
+        show_in_ui = True
+        macro = None
+        try:
+            args = [self.evaluator.evaluate(arg_node, self.variables) for arg_node in node.value.args]
+            if func_name in safe_globals:
+                if func_name == "hideInUI" and args:
+                    target_name = args[0]
+                    for el in self.history:
+                        if el.cmd.startswith(("create", "fixed")) and el.args and el.args[-1] == target_name:
+                            el.show_in_ui = False
+                else:
+                    func = safe_globals[func_name]
+                    func(self.objects, *args)
+
+                # Only hide utility commands from the UI
+                if func_name in ("setType", "setStyle", "setVisibilities", "hideInUI", "setResize"):
+                    show_in_ui = False
+            elif func_name in COMMANDS:
+                func = COMMANDS[func_name]
+                func(id, self.objects, *args)
+                if args and isinstance(args[-1], str) and args[-1].startswith("_"):
+                    show_in_ui = False
+            elif isinstance(self.variables.get(func_name), Macro):
+                macro = self.variables[func_name]
+                reads = set()
+                macro(id, self.objects, self.variables, reads, *args)
+            else:
+                print(f"Unknown command: {func_name}")
+                return None
+            element = Element(
+                id,
+                func_name,
+                args,
+                gen_content_from_args(id, func_name, args),
+                line_source,
+                show_in_ui,
+                node,
+            )
+            if macro is not None:
+                element.inputs = self.symbols.intern_all(macro.names | reads)
+            return element
+        except Exception as e:
+            print(f"Error executing command '{func_name}': {e}")
+            return None
+
+    def _define_macro(self, node: ast.FunctionDef, id: int, line_source: str) -> Element | None:
+        utilities = {name: func for name, func in self.safe_globals.items() if name not in ("hideInUI", "baked")}
+        try:
+            macro = compile_macro(node, self.evaluator, COMMANDS, utilities, self.variables)
+        except Exception as e:
+            print(f"Failed to define macro '{node.name}': {e}")
+            return None
+        # Kept with the variables: a call finds it by name, and undefining
+        # it is the same as dropping a variable.
+        self.variables[node.name] = macro
+        element = Element(
+            id,
+            "MACRO",
+            [],
+            ObjectPreviewType(
+                f"{node.name}({', '.join(macro.params)})", ObjectTypes.UNKNOWN, "", f"macro, {len(macro.steps)} steps", id
+            ),
+            line_source,
+            node=node,
+        )
+        element.outputs = {self.symbols.intern(node.name)}
+        return element
+
+    def _source_of(self, node: ast.stmt) -> str:
+        source = self._node_sources.get(node)
+        if source is None:
+            source = self._node_sources[node] = ast.unparse(node)
+        return source
+
+    def _referenced_names(self, node: ast.stmt) -> set[int]:
+        """Symbols of the names a statement may depend on: every string
+        literal ("A1") and every variable it reads (d). Deliberately
+        generous - a name that does not exist yet still counts, so a command
+        that failed for lack of it is retried once it appears."""
+        handles = self._node_names.get(node)
+        if handles is None:
+            names = set()
+            for sub in ast.walk(node):
+                if isinstance(sub, ast.Constant) and isinstance(sub.value, str):
+                    names.add(sub.value)
+                elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load):
+                    names.add(sub.id)
+            handles = self._node_names[node] = frozenset(self.symbols.intern_all(names))
+        return set(handles)
+
+    def _rerun(self, el: Element) -> bool:
+        """Re-execute an existing element in place, keeping its id and position.
+        A failing element stays in history (so its source is not lost) but
+        no longer produces anything."""
+        old_outputs = el.outputs
+        node = el.node if el.node is not None else ast.parse(el.source).body[0]
+        self._unindex(el)
+        fresh = self._execute(node, el.id)
+        if fresh is None:
+            el.inputs = self._referenced_names(node)
+            el.outputs = set()
+        else:
+            el.cmd = fresh.cmd
+            el.args = fresh.args
+            el.content = fresh.content
+            el.show_in_ui = fresh.show_in_ui
+            el.inputs = fresh.inputs
+            el.outputs = fresh.outputs
+        el.node = node
+        self._index(el)
+        for handle in old_outputs - el.outputs:
+            self._discard_name(handle, el.id)
+        return fresh is not None
+
+    def _discard_name(self, handle: int, owner_id: int) -> None:
+        name = self.symbols.name(handle)
+        obj = self.objects.get(name)
+        if obj is not None and getattr(obj, "id", None) == owner_id:
+            del self.objects[name]
+        self.variables.pop(name, None)
+
+    def _recompute(self, dirty: set[int], changed: set[int]) -> None:
+        """Walk history in order and re-run the dirty elements plus everything
+        that reads a changed name (or overwrites one, so the last writer still
+        wins). Untouched elements keep their objects as they are."""
+        for el in self.history:
+            if el.id not in dirty and not (el.inputs & changed) and not (el.outputs & changed):
+                continue
+            old_outputs = el.outputs
+            self._rerun(el)
+            changed |= old_outputs | el.outputs
+
+    def _dependents(self, changed: set[int], exclude: Iterable[Element] = ()) -> list[Element]:
+        """The elements that would have to re-run, in history order, if the
+        given names changed - the same walk as _recompute, but planned once
+        from the recorded inputs/outputs so it can be replayed many times.
+        Found through the reverse index, so only the dependents are visited."""
+        skip = {el.id for el in exclude}
+        queued: set[int] = set()
+        heap: list[tuple[int, int]] = []
+
+        def enqueue(handles, after):
+            # Like the walk, an element only picks up what was written
+            # before it (or what changed to begin with, after=-1).
+            for handle in handles:
+                for el in self._users.get(handle, ()):
+                    if el.id in queued or el.id in skip:
                         continue
-                    element = Element(
-                        id,
-                        func_name,
-                        args,
-                        gen_content_from_args(id, func_name, args),
-                        line_source,
-                        show_in_ui,
-                    )
-                    self.history.append(element)
-                    if show_in_ui:
-                        last_element = element
-
-                except Exception as e:
-                    print(f"Error executing command '{func_name}': {e}")
-        return last_element
-        
+                    position = self._position_of(el)
+                    if position > after:
+                        queued.add(el.id)
+                        heapq.heappush(heap, (position, el.id))
+
+        enqueue(changed, -1)
+        plan = []
+        while heap:
+            position, _ = heapq.heappop(heap)
+            el = self.history[position]
+            plan.append(el)
+            enqueue(el.outputs, position)
+        return plan
+
+    def sweep(self, name: str, values: Iterable[float]) -> Iterator[tuple[float, dict[str, Any]]]:
+        """Re-evaluate the construction for each value of the variable `name`
+        and yield (value, objects). Only the part of the script that depends
+        on the variable is re-run; that plan is worked out once for all
+        values. Each yielded dict is a snapshot of which objects exist, but
+        objects untouched by the variable are shared between frames, so use
+        a frame before advancing. The variable is restored afterwards."""
+        handle = self.symbols.get(name)
+        assigners = [el for el in self.history if el.cmd == "ASSIGN" and handle in el.outputs]
+        if not assigners:
+            raise KeyError(f"No variable named '{name}'")
+        plan = self._dependents({handle}, exclude=assigners)
+        original = self.variables[name]
+        try:
+            for value in values:
+                self.variables[name] = value
+                for el in plan:
+                    self._rerun(el)
+                yield value, dict(self.objects)
+        finally:
+            self.variables[name] = original
+            for el in plan:
+                self._rerun(el)
+
+    def numeric_variables(self) -> list[str]:
+        """Variables holding a number, i.e. the ones that can be swept."""
+        return [
+            name
+            for el in self.history
+            if el.cmd == "ASSIGN"
+            for name in sorted(self.symbols.name(handle) for handle in el.outputs)
+            if isinstance(self.variables.get(name), (int, float))
+        ]
+
+    def draggable_element(self, name: str) -> Element | None:
+        """The createPoint statement behind the point `name`, if its
+        coordinates are plain numbers and so can be changed by dragging."""
+        obj = self.objects.get(name)
+        if not isinstance(obj, Point) or obj.projection not in (1, 2):
+            return None
+        for el in self.history:
+            if el.id != obj.id or el.cmd != "createPoint" or el.node is None:
+                continue
+            call = el.node.value if isinstance(el.node, ast.Expr) else None
+            if not isinstance(call, ast.Call) or not call.args:
+                return None
+            cords = call.args[0]
+            if isinstance(cords, ast.Tuple) and len(cords.elts) == 3 and all(
+                _is_literal_number(elt) for elt in cords.elts
+            ):
+                return el
+        return None
+
+    def begin_drag(self, name: str) -> bool:
+        """Start dragging the point `name`. What depends on it is planned
+        once here, so every drag_to only re-runs that part of the script."""
+        el = self.draggable_element(name)
+        if el is None:
+            return False
+        projection = self.objects[name].projection
+        self._drag = (el, projection, self._dependents(el.outputs, exclude=[el]), self.get_script())
+        return True
+
+    @_timed_edit
+    def drag_to(self, x: float, y: float) -> None:
+        """Move the dragged point to logical position (x, y) of its own
+        projection; its other projection follows along the ordinal line."""
+        if self._drag is None:
+            return
+        el, projection, plan, _ = self._drag
+        cords = list(el.args[0])
+        cords[0] = _drag_number(-x)
+        if projection == 1:
+            cords[1] = _drag_number(-y)
+        else:
+            cords[2] = _drag_number(y)
+        if tuple(cords) == tuple(el.args[0]):
+            return
+        call = el.node.value
+        args = [ast.Tuple(elts=[ast.Constant(value=c) for c in cords], ctx=ast.Load()), *call.args[1:]]
+        # A new node, so the evaluator compiles the new coordinates.
+        el.node = ast.Expr(value=ast.Call(func=call.func, args=args, keywords=[]))
+        el.source = self._source_of(el.node)
+        self._rerun(el)
+        for dependent in plan:
+            self._rerun(dependent)
+        self.is_dirty = True
+
+    def end_drag(self) -> bool:
+        """Finish the drag as one undoable edit. Returns True if the point moved."""
+        if self._drag is None:
+            return False
+        el, _, _, start_script = self._drag
+        self._drag = None
+        if self.get_script() == start_script:
+            return False
+        # Recorded the way push_state + modify_element would be, so the
+        # journal replays it.
+        self._journal("push")
+        self.undo_stack.append(start_script)
+        self.redo_stack.clear()
+        self._journal("modify", id=el.id, source=el.source)
+        return True
+
+    @_timed_edit
+    def reload(self, text: str) -> bool:
+        """Apply an externally edited version of the file. The new script is
+        diffed against history statement by statement and only the changed
+        statements and their dependents are re-evaluated. Returns True if
+        anything changed."""
+        settings, script = split_header(text)
+        try:
+            tree = ast.parse(script)
+        except SyntaxError as e:
+            print(f"Syntax error in script: {e}")
+            return False
+        previous_script = self.get_script()
+        previous_settings = dict(self.settings)
+        self.settings.update(settings)
+
+        new_nodes = tree.body
+        new_sources = [ast.unparse(node) for node in new_nodes]
+        old_sources = [el.source for el in self.history]
+        matcher = difflib.SequenceMatcher(None, old_sources, new_sources, autojunk=False)
+
+        history: list[Element] = []
+        dirty: set[int] = set()
+        changed: set[int] = set()
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                history.extend(self.history[i1:i2])
+                continue
+            # An edited statement keeps its element (id and place in objects)
+            # and is simply re-run with the new source.
+            paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+            for el, node, source in zip(
+                self.history[i1:i1 + paired], new_nodes[j1:j1 + paired], new_sources[j1:j1 + paired]
+            ):
+                if not el.outputs:
+                    changed |= el.inputs
+                el.source = source
+                el.node = node
+                dirty.add(el.id)
+                history.append(el)
+            i1 += paired
+            j1 += paired
+            for el in self.history[i1:i2]:
+                # Removing a modifier (setStyle, hideObject...) means its
+                # targets have to be rebuilt without it.
+                changed |= el.outputs if el.outputs else el.inputs
+                self._unindex(el)
+                for handle in el.outputs:
+                    self._discard_name(handle, el.id)
+            for node, source in zip(new_nodes[j1:j2], new_sources[j1:j2]):
+                el = Element(
+                    self.next_id,
+                    "",
+                    [],
+                    ObjectPreviewType(source, ObjectTypes.UNKNOWN, "", "", self.next_id),
+                    source,
+                    node=node,
+                )
+                self.next_id += 1
+                dirty.add(el.id)
+                history.append(el)
+
+        if not dirty and not changed and self.settings == previous_settings:
+            return False
+        self._journal("reload", text=text)
+        self.history[:] = history
+        self._positions = None
+        self._recompute(dirty, changed)
+        self.document.file = text
+        self.undo_stack.append(previous_script)
+        self.redo_stack.clear()
+        self.is_dirty = False
+        return True
+
+    @_timed_edit
     def modify_element(self, target_id: int, new_command: str) -> None:
+        self._journal("modify", id=target_id, source=new_command)
         self.is_dirty = True
         element_found = False
         for el in self.history:
@@ -246,51 +770,42 @@ class Project:
                 script_lines.append(el.source)
         self.objects.clear()
         self.variables.clear()
-        self.history.clear()
+        self._clear_history()
         self.objects["org_x"] = create_objects.org_x
         self.objects["org_y"] = create_objects.org_y
         self.next_id = 2
         full_script = "\n".join(script_lines)
         if full_script.strip():
-            self.add_new_commands(full_script)
+            self._run_script(full_script)
 
-    def save(self):
-        import json
-        self.is_dirty = False
+    @property
+    def is_dirty(self) -> bool:
+        """Whether there are edits the file does not have. A background save
+        only clears it once it has reached the disk, and only if nothing was
+        edited in the meantime."""
+        if self._saving is not None and self._saving[0].done():
+            saving, edits = self._saving
+            self._saving = None
+            if saving.exception() is None and edits == self._edits:
+                self._dirty = False
+        return self._dirty
+
+    @is_dirty.setter
+    def is_dirty(self, value: bool) -> None:
+        self._dirty = value
+        if value:
+            self._edits += 1
+
+    def save(self, background: bool = False):
         script_lines = []
         vis_dict = {}
-
         for el in self.history:
-            if el.cmd in ("setStyle", "setType", "setVisibilities"):
-                if el.cmd == "setStyle":
-                    obj_name, style = el.args
-                    vis_dict.setdefault(obj_name, ["normal", "construct"])[0] = style
-                elif el.cmd == "setType":
-                    obj_name, ltype = el.args
-                    vis_dict.setdefault(obj_name, ["normal", "construct"])[1] = ltype
-                elif el.cmd == "setVisibilities":
-                    if el.args and isinstance(el.args[0], dict):
-                        for k, v in el.args[0].items():
-                            vis_dict.setdefault(k, ["normal", "construct"])
-                            if len(v) > 0: vis_dict[k][0] = v[0]
-                            if len(v) > 1: vis_dict[k][1] = v[1]
-                continue
-
-            if el.source:
-                if el.cmd == "ASSIGN" and (el.source.startswith("visibilities =") or el.source.startswith("visibilities=")):
-                    continue
-                script_lines.append(el.source)
-            else:
-                if el.cmd == "ASSIGN":
-                    continue
-                formatted_args = []
-                for arg in el.args:
-                    if isinstance(arg, str):
-                        formatted_args.append(f"'{arg}'")
-                    else:
-                        formatted_args.append(str(arg))
-
-                line = f"{el.cmd}({', '.join(formatted_args)})"
+            line, vis_updates = serialize_element(el)
+            for obj_name, index, value in vis_updates:
+                props = vis_dict.setdefault(obj_name, ["normal", "construct"])
+                if index is not None:
+                    props[index] = value
+            if line is not None:
                 script_lines.append(line)
 
         if vis_dict:
@@ -303,18 +818,437 @@ class Project:
         script_lines.insert(0, f"# settings = {settings_json}")
 
         self.document.file = "\n".join(script_lines)
-        self.document.save()
+        saved = self.document.save(background)
+        if saved is None:
+            self.is_dirty = False
+        else:
+            self._saving = (saved, self._edits)
+        if self.journal is not None:
+            path = journal_path_for(self.document.file_path)
+            if self.journal.path != path:
+                # Saved under a new name: the old journal's edits are in the
+                # file, unless the save fails.
+                self.journal.close(delete=self._journal_spent())
+                self.journal = Journal(path)
+            self.journal.rebase(self.document.file_hash, after=saved)
+
+    def enable_journal(self) -> None:
+        """Start journaling edits so they survive a crash. Edits left over
+        from a crashed session end up in recoverable_ops."""
+        self.journaling = True
+        self._open_journal()
+
+    def _open_journal(self) -> None:
+        # Edits of a crashed session that were neither recovered nor
+        # discarded, or that a failed save left out of the file, stay on
+        # disk, to be offered again next time.
+        if self.journal is not None:
+            self.journal.close(delete=self._journal_spent())
+        self.document.save_failed = False
+        if self.document.file_path:
+            self.journal = Journal(journal_path_for(self.document.file_path))
+        else:
+            self.journal = Journal.untitled()
+        self.recoverable_ops = self.journal.load(self.document.file_hash)
+
+    def close_journal(self) -> None:
+        """Stop journaling at a clean shutdown; nothing is left to recover
+        but what was never offered, or what a failed save did not write."""
+        if self.journal is not None:
+            self.journal.close(delete=self._journal_spent())
+            self.journal = None
 
-    def remove_element(self, target_id: int):
+    def _journal_spent(self) -> bool:
+        """Whether the journal can go: no edits of a crashed session are left
+        to offer, and the last save put everything else in the file."""
+        self.document.wait_for_save()
+        return not self.recoverable_ops and not self.document.save_failed
+
+    def _journal(self, op: str, **data) -> None:
+        if self.journal is not None and not self._replaying:
+            self.journal.record(op, **data)
+
+    def recover_journal(self) -> None:
+        """Replay the edits of a crashed session on top of the opened file."""
+        ops, self.recoverable_ops = self.recoverable_ops, []
+        self._replaying = True
+        try:
+            for record in ops:
+                match record.get("op"):
+                    case "commands":
+                        self.add_new_commands(record["script"])
+                    case "push":
+                        self.push_state()
+                    case "undo":
+                        self.undo()
+                    case "redo":
+                        self.redo()
+                    case "modify":
+                        self.modify_element(record["id"], record["source"])
+                    case "remove":
+                        self.remove_element(record["id"], record.get("mode", "cascade"))
+                    case "bake":
+                        self.bake(record["ids"])
+                    case "unbake":
+                        self.unbake(record["id"])
+                    case "reload":
+                        self.reload(record["text"])
+        finally:
+            self._replaying = False
         self.is_dirty = True
-        self.history = [el for el in self.history if el.id != target_id]
-        keys_to_delete = []
-        for key, obj in self.objects.items():
-            if hasattr(obj, "id") and obj.id == target_id:
-                keys_to_delete.append(key)
-        for key in keys_to_delete:
-            del self.objects[key]
-        self.rebuild_project()
+
+    def discard_recovery(self) -> None:
+        self.recoverable_ops = []
+        if self.journal is not None:
+            self.journal.rebase(self.document.file_hash)
+
+    def autosave(self) -> bool:
+        """Compact the journal into the .mgs (a background save) once there
+        is something to compact. Untitled projects only keep the journal."""
+        if self.journal is None or not self.journal.op_count or not self.document.file_path:
+            return False
+        self.save(background=True)
+        return True
+
+    def removal_dependents(self, target_id: int) -> list[Element]:
+        """What removing the element would take with it: everything built
+        from its objects, directly or through each other, in history order."""
+        target = self._element(target_id)
+        if target is None:
+            return []
+        removed, _ = self._removal_plan(target, freeze=False)
+        return removed[1:]
+
+    @_timed_edit
+    def remove_element(self, target_id: int, mode: str = "cascade") -> None:
+        """Remove an element. What was built from its objects is removed
+        too ("cascade"), or, with mode="freeze", kept as fixed objects at
+        their current coordinates (fixedPoint, fixedLine, fixedPolyline,
+        fixedCircle; variables keep their value). Dependents that cannot be frozen -
+        planes, ellipses, modifiers of a removed object - are removed.
+        Only the elements that read what changed are re-evaluated."""
+        target = self._element(target_id)
+        if target is None:
+            return
+        self._journal("remove", id=target_id, mode=mode)
+        self.is_dirty = True
+        removed, frozen = self._removal_plan(target, freeze=mode == "freeze")
+        replacements = {el.id: [] for el in removed}
+        for el in frozen:
+            replacements[el.id] = self._frozen_elements(el)
+        self._splice(replacements)
+
+    def _splice(
+        self, replacements: dict[int, list[Element]], insertions: dict[int, list[Element]] | None = None
+    ) -> None:
+        """Replace elements of history (by id) with new, not yet run ones -
+        none to just remove them - and insert new ones after the elements
+        (by id) in `insertions`. Then re-run only what that affects: the
+        new elements and whatever reads or writes a name that changed."""
+        insertions = insertions or {}
+        changed: set[int] = set()
+        history = []
+        fresh = []
+        for el in self.history:
+            if el.id not in replacements:
+                history.append(el)
+            else:
+                # A removed modifier (setStyle, hideObject...) means its targets
+                # have to be rebuilt without it.
+                changed |= el.outputs if el.outputs else el.inputs
+                self._unindex(el)
+                for handle in el.outputs:
+                    self._discard_name(handle, el.id)
+                history.extend(replacements[el.id])
+                fresh.extend(replacements[el.id])
+            history.extend(insertions.get(el.id, ()))
+            fresh.extend(insertions.get(el.id, ()))
+        self.history[:] = history
+        self._positions = None
+
+        plan = {el.id: el for el in self._dependents(changed)}
+        plan.update((el.id, el) for el in fresh)
+        for el in sorted(plan.values(), key=self._position_of):
+            self._rerun(el)
+
+    @_timed_edit
+    def bake(self, ids: Iterable[int]) -> Element | None:
+        """Replace the given elements with fixed objects at their current
+        coordinates, so replaying that part of the script costs nothing.
+        The construction is kept, unevaluated, in a `baked` statement in
+        place of the first of them; unbake puts it back. Elements that
+        cannot be written as fixed objects are left alone. Returns the
+        group element, or None if there was nothing to bake."""
+        ids = set(ids)
+        targets = self._bake_targets(ids)
+        if not targets:
+            return None
+        self._journal("bake", ids=sorted(ids))
+        self.is_dirty = True
+        group = [(el.source, sorted(self.symbols.name(handle) for handle in el.outputs)) for el in targets]
+        replacements = {el.id: self._frozen_elements(el) for el in targets}
+        replacements[targets[0].id][:0] = self._new_elements([f"baked({group!r})"])
+        self._splice(replacements)
+        return replacements[targets[0].id][0]
+
+    def can_bake(self, ids: Iterable[int]) -> bool:
+        """Whether bake(ids) would bake anything."""
+        return bool(self._bake_targets(ids))
+
+    def _bake_targets(self, ids: Iterable[int]) -> list[Element]:
+        ids = set(ids)
+        return [el for el in self.history if el.id in ids and el.cmd != "baked" and self._freezable(el)]
+
+    @_timed_edit
+    def unbake(self, group_id: int) -> bool:
+        """Put back the construction kept by a `baked` statement in place of
+        the fixed objects it was baked into. Returns False if `group_id` is
+        not a baked group."""
+        group = self._element(group_id)
+        if group is None or group.cmd != "baked" or not group.args:
+            return False
+        self._journal("unbake", id=group_id)
+        self.is_dirty = True
+        replacements: dict[int, list[Element]] = {group.id: []}
+        insertions: dict[int, list[Element]] = {}
+        # The first fixed element writing one of an original's names takes
+        # its place again. One without (deleted since, or never baked)
+        # comes back right after the last element writing a name it uses,
+        # or where the group was if there is none.
+        anchors: dict[int, Element] = {}  # restored name -> what it went after
+        position = self._position_of(group)
+        for source, names in group.args[0]:
+            handles = {self.symbols.intern(name) for name in names}
+            fixed = [
+                el
+                for el in self.history[position + 1:]
+                if el.outputs & handles and el.id not in replacements
+                and (el.cmd.startswith("fixed") or el.cmd == "ASSIGN")
+            ]
+            restored = self._new_elements([source])
+            if fixed:
+                replacements[fixed[0].id] = restored
+                replacements.update((el.id, []) for el in fixed[1:])
+                continue
+            anchor = self._last_writer(_mentioned_names(restored[0].node), anchors)
+            if anchor is None:
+                replacements[group.id] += restored
+                continue
+            insertions.setdefault(anchor.id, []).extend(restored)
+            anchors.update((handle, anchor) for handle in handles)
+        self._splice(replacements, insertions)
+        return True
+
+    def _last_writer(self, names: set[str], anchors: dict[int, Element]) -> Element | None:
+        """The latest element in history writing one of the names, counting
+        the ones in `anchors` as written by the element they map to."""
+        writers = []
+        for name in names:
+            handle = self.symbols.get(name)
+            if handle is None:
+                continue
+            if handle in anchors:
+                writers.append(anchors[handle])
+            writers.extend(el for el in self._users.get(handle, ()) if handle in el.outputs)
+        return max(writers, key=self._position_of, default=None)
+
+    def _new_elements(self, sources: list[str]) -> list[Element]:
+        """History elements for statements that have not run yet."""
+        elements = []
+        for source in sources:
+            elements.append(
+                Element(
+                    self.next_id,
+                    "",
+                    [],
+                    ObjectPreviewType(source, ObjectTypes.UNKNOWN, "", "", self.next_id),
+                    source,
+                    node=ast.parse(source).body[0],
+                )
+            )
+            self.next_id += 1
+        return elements
+
+    def _element(self, target_id: int) -> Element | None:
+        for el in self.history:
+            if el.id == target_id:
+                return el
+        return None
+
+    def _removal_plan(self, target: Element, freeze: bool) -> tuple[list[Element], list[Element]]:
+        """The elements to remove (target first) and to freeze. An element
+        depends on the target if it reads an object or variable that the
+        target, or another removed element, wrote."""
+        removed = [target]
+        frozen = []
+        seen = {target.id}
+        pending = list(target.outputs)
+        while pending:
+            handle = pending.pop()
+            for el in self._users.get(handle, ()):
+                if el.id in seen or handle not in el.inputs or _tolerates_missing(el):
+                    continue
+                seen.add(el.id)
+                if freeze and self._freezable(el):
+                    frozen.append(el)
+                else:
+                    removed.append(el)
+                    pending.extend(el.outputs)
+        # _users holds sets: put both in history order, so the new elements
+        # get the same ids every time (the journal replays by id)
+        removed[1:] = sorted(removed[1:], key=self._position_of)
+        frozen.sort(key=self._position_of)
+        return removed, frozen
+
+    def _freezable(self, el: Element) -> bool:
+        return bool(el.outputs) and all(
+            self._frozen_source(self.symbols.name(handle), el.id) is not None for handle in el.outputs
+        )
+
+    def _frozen_elements(self, el: Element) -> list[Element]:
+        """Statements recreating what the element made, at its current
+        coordinates, as new history elements."""
+        names = sorted(self.symbols.name(handle) for handle in el.outputs)
+        return self._new_elements([self._frozen_source(name, el.id) for name in names])
+
+    def _frozen_source(self, name: str, owner_id: int) -> str | None:
+        """The statement that recreates `name` without a construction, or None
+        if it cannot be written down."""
+        obj = self.objects.get(name)
+        if obj is not None and getattr(obj, "id", None) == owner_id:
+            match obj:
+                case Point():
+                    return f"fixedPoint({_fixed_cords(obj)}, {name!r})"
+                case Line():
+                    return f"fixedLine({_fixed_cords(obj.p1)}, {_fixed_cords(obj.p2)}, {name!r})"
+                case Polyline():
+                    vertices = [(_fixed_number(-x), _fixed_number(y)) for x, y in obj.vertices.tolist()]
+                    return f"fixedPolyline({vertices!r}, {name!r}, {obj.closed!r})"
+                case Circle():
+                    args = [_fixed_cords(obj.center), repr(_fixed_number(obj.radius)), repr(name)]
+                    if obj.draw_from is not None:
+                        args += [repr(_fixed_number(obj.draw_from)), repr(_fixed_number(obj.draw_span))]
+                    return f"fixedCircle({', '.join(args)})"
+            return None
+        if name in self.variables:
+            value = self.variables[name]
+            if isinstance(value, np.generic):
+                value = value.item()
+            try:
+                if ast.literal_eval(repr(value)) == value:
+                    return f"{name} = {value!r}"
+            except (ValueError, SyntaxError):
+                pass
+        return None
+
+
+def serialize_element(el: Element) -> tuple[str | None, list[tuple[str, int | None, str]]]:
+    """Return the line an element contributes to a saved file (None if it
+    has none) and the style/type updates it folds into `visibilities`."""
+    if el.cmd in ("setStyle", "setType", "setVisibilities"):
+        vis_updates = []
+        if el.cmd == "setStyle":
+            obj_name, style = el.args
+            vis_updates.append((obj_name, 0, style))
+        elif el.cmd == "setType":
+            obj_name, ltype = el.args
+            vis_updates.append((obj_name, 1, ltype))
+        elif el.cmd == "setVisibilities":
+            if el.args and isinstance(el.args[0], dict):
+                for k, v in el.args[0].items():
+                    vis_updates.append((k, None, ""))
+                    if len(v) > 0: vis_updates.append((k, 0, v[0]))
+                    if len(v) > 1: vis_updates.append((k, 1, v[1]))
+        return None, vis_updates
+
+    if el.source:
+        if el.cmd == "ASSIGN" and (el.source.startswith("visibilities =") or el.source.startswith("visibilities=")):
+            return None, []
+        return el.source, []
+    if el.cmd == "ASSIGN":
+        return None, []
+    formatted_args = []
+    for arg in el.args:
+        if isinstance(arg, str):
+            formatted_args.append(f"'{arg}'")
+        else:
+            formatted_args.append(str(arg))
+    return f"{el.cmd}({', '.join(formatted_args)})", []
+
+
+def _is_literal_number(node: ast.expr) -> bool:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    return isinstance(node, ast.Constant) and (
+        node.value is None or (isinstance(node.value, (int, float)) and not isinstance(node.value, bool))
+    )
+
+
+def _drag_number(value: float) -> float | int:
+    value = round(value, DRAG_PRECISION) + 0.0  # no "-0.0" in the source
+    return int(value) if value.is_integer() else value
+
+
+def _fixed_number(value: float) -> float | int:
+    # Computed coordinates are often NumPy scalars, whose repr is a call
+    # (np.float64(1.4)) that scripts may not make.
+    value = round(float(value), FREEZE_PRECISION) + 0.0
+    return int(value) if value.is_integer() else value
+
+
+def _fixed_cords(point: Point) -> str:
+    """A point's coordinates the way Point (and fixedPoint) take them."""
+    return repr((_fixed_number(-point.x), _fixed_number(point.y)))
+
+
+def _mentioned_names(node: ast.AST) -> set[str]:
+    """Every name a statement could refer to: its strings and variables."""
+    names = set()
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Constant) and isinstance(sub.value, str):
+            names.add(sub.value)
+        elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load):
+            names.add(sub.id)
+    return names
+
+
+def _tolerates_missing(el: Element) -> bool:
+    """Elements that only name objects in passing and keep working when one
+    is gone: setVisibilities, baked groups, macro definitions (their calls
+    do depend on the names), and plain data such as the visibilities dict."""
+    if el.cmd in ("setVisibilities", "baked", "MACRO"):
+        return True
+    return el.cmd == "ASSIGN" and el.node is not None and not any(
+        isinstance(sub, ast.Call) for sub in ast.walk(el.node)
+    )
+
+
+def parse_header_line(stripped: str) -> dict[str, Any] | None:
+    """Settings carried by one magic comment line, or None if the line is
+    not one of them."""
+    if stripped.startswith("# settings ="):
+        try:
+            return json.loads(stripped[len("# settings ="):].strip())
+        except:
+            return {}
+    if stripped.startswith("# project_name:"):
+        return {"project_name": stripped[len("# project_name:"):].strip()}
+    if stripped.startswith("# work_number:"):
+        return {"work_number": stripped[len("# work_number:"):].strip()}
+    return None
+
+
+def split_header(text: str) -> tuple[dict[str, Any], str]:
+    """Separate the magic settings comments from the script body."""
+    settings: dict[str, Any] = {}
+    script_lines = []
+    for line in text.split("\n"):
+        header = parse_header_line(line.strip()) if line.lstrip().startswith("#") else None
+        if header is None:
+            script_lines.append(line)
+        else:
+            settings.update(header)
+    return settings, "\n".join(script_lines)
 
 
 def gen_content_from_args(id, cmd, args):
@@ -351,6 +1285,10 @@ def gen_content_from_args(id, cmd, args):
                 f"c={args[0]}, p1={args[1]}, p2={args[2]}",
                 id,
             )
+        case "splitLine":
+            return ObjectPreviewType(
+                f"{args[2]}_1…{len(args[1]) + 1}", ObjectTypes.LINE, "normal", f"{args[0]} / {', '.join(args[1])}", id
+            )
         case "createSplitSegment":
             return ObjectPreviewType(
                 f"{args[3]} ({args[1]}, {args[2]})",
@@ -399,7 +1337,46 @@ def gen_content_from_args(id, cmd, args):
                 f"∥ {args[1]}, off={args[2]}",
                 id,
             )
-        case "setCircleDrawRange":
+        case "fixedPoint":
+            return ObjectPreviewType(args[1], ObjectTypes.POINT, "normal", f"fixed {args[0]}", id)
+        case "fixedPolyline":
+            return ObjectPreviewType(args[1], ObjectTypes.LINE, "normal", f"fixed, {len(args[0])} vertices", id)
+        case "fixedLine":
+            return ObjectPreviewType(args[2], ObjectTypes.LINE, "normal", f"fixed {args[0]}, {args[1]}", id)
+        case "fixedCircle":
+            return ObjectPreviewType(
+                args[2], ObjectTypes.CIRCLE, "normal", f"fixed c={args[0]}, r={args[1]}", id
+            )
+        case "baked":
+            names = [name for _, names in args[0] for name in names]
+            return ObjectPreviewType(
+                f"Baked ({len(args[0])})", ObjectTypes.UNKNOWN, "", ", ".join(names), id
+            )
+        case "createPolyline":
+            return ObjectPreviewType(
+                args[1], ObjectTypes.LINE, "normal", " → ".join(args[0]) + (" ↺" if args[2:3] == [True] else ""), id
+            )
+        case "createPolygon":
+            return ObjectPreviewType(
+                args[4] if len(args) > 4 else f"{len(args[2]) + 1}-gon",
+                ObjectTypes.POINT,
+                "normal",
+                f"c={args[0]}, {args[1]}",
+                id,
+            )
+        case "createCirclePoints":
+            return ObjectPreviewType(
+                args[4] if len(args) > 4 else f"{len(args[1])} on {args[0]}",
+                ObjectTypes.POINT,
+                "normal",
+                f"{len(args[1])} on {args[0]}",
+                id,
+            )
+        case "createGrid":
+            return ObjectPreviewType(
+                args[3], ObjectTypes.POINT, "normal", f"{args[2][0]}×{args[2][1]} from {args[0]}", id
+            )
+        case "setCircleDrawRange" | "setEllipseDrawRange":
             return ObjectPreviewType(
                 cmd,
                 ObjectTypes.UNKNOWN,
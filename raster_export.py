@@ -0,0 +1,125 @@
+import os
+import struct
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from PyQt6.QtGui import QColor, QImage, QPainter
+
+from canvas import DrawingCanvas
+
+PAPER_SIZES_MM = {"A4": (210, 297), "A3": (297, 420)}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class RasterExport:
+    """Renders the sheet to a PNG with the canvas drawing routines.
+
+    The page is drawn in horizontal strips of `strip_height` pixels, so a
+    600 DPI A3 sheet (7016 x 9921 px) never needs one giant QImage. Each
+    strip is deflated on a worker thread as an independent, byte-aligned
+    piece of a single zlib stream (the way pigz does it), and the pieces
+    are written to the file in order as they finish.
+
+    Needs a running QApplication: the drawing routines belong to a
+    DrawingCanvas, which is a QWidget."""
+
+    def __init__(self, dpi=300, paper="A4", strip_height=256, workers=None):
+        self.dpi = dpi
+        self.paper = paper
+        self.strip_height = strip_height
+        self.workers = workers or os.cpu_count() or 1
+        self.compress_level = 6
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+    def set_offset(self, offset_x=0.0, offset_y=0.0):
+        """Project offset in coordinate units, like settings['offset_x/y']"""
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+    def page_size_px(self) -> tuple[int, int]:
+        w_mm, h_mm = PAPER_SIZES_MM[self.paper]
+        mm_to_px = self.dpi / 25.4
+        return round(w_mm * mm_to_px), round(h_mm * mm_to_px)
+
+    def drawScene(self, objects, filename="output.png"):
+        """Render objects onto a blank sheet and save it as PNG"""
+        canvas = self._make_canvas(objects)
+        try:
+            self._write_png(canvas, filename)
+        finally:
+            # Parentless, so nothing else would ever free it
+            canvas.deleteLater()
+
+    def _write_png(self, canvas: DrawingCanvas, filename):
+        width, height = self.page_size_px()
+        with open(filename, "wb") as f:
+            f.write(PNG_SIGNATURE)
+            _write_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            px_per_meter = round(self.dpi / 0.0254)
+            _write_chunk(f, b"pHYs", struct.pack(">IIB", px_per_meter, px_per_meter, 1))
+            _write_chunk(f, b"IDAT", b"\x78\x9c")  # zlib header of the IDAT stream
+
+            adler = 1
+            pending: list[Future] = []
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mongoose-png") as pool:
+                for top in range(0, height, self.strip_height):
+                    rows = min(self.strip_height, height - top)
+                    raw = self._render_strip(canvas, width, height, top, rows)
+                    adler = zlib.adler32(raw, adler)
+                    last = top + rows >= height
+                    pending.append(pool.submit(_deflate_piece, raw, last, self.compress_level))
+                    # Keep memory flat: never more strips in flight than workers.
+                    while len(pending) > self.workers or (last and pending):
+                        _write_chunk(f, b"IDAT", pending.pop(0).result())
+
+            _write_chunk(f, b"IDAT", struct.pack(">I", adler))
+            _write_chunk(f, b"IEND", b"")
+
+    def _make_canvas(self, objects) -> DrawingCanvas:
+        # Never shown; it only lends its draw_* routines at the export DPI.
+        canvas = DrawingCanvas(objects, {"offset_x": self.offset_x, "offset_y": self.offset_y})
+        canvas.mm_to_px = self.dpi / 25.4
+        return canvas
+
+    def _render_strip(self, canvas: DrawingCanvas, width, height, top, rows) -> bytes:
+        """Draw rows [top, top + rows) of the page and return them as PNG
+        scanlines (filter byte + RGB)."""
+        image = QImage(width, rows, QImage.Format.Format_RGB888)
+        dots_per_meter = round(self.dpi / 0.0254)
+        image.setDotsPerMeterX(dots_per_meter)
+        image.setDotsPerMeterY(dots_per_meter)
+        image.fill(QColor(255, 255, 255))
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # Page center, shifted up by the strip's position on the page
+        painter.translate(width / 2, height / 2 - top)
+        off_x = self.offset_x * canvas.scale * canvas.mm_to_px
+        off_y = self.offset_y * canvas.scale * canvas.mm_to_px
+        painter.translate(off_x, -off_y)  # Y is inverted in our coordinate system
+        canvas.draw_objects(painter)
+        painter.end()
+
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        pixels = np.frombuffer(bits, np.uint8).reshape(rows, image.bytesPerLine())
+        scanlines = np.zeros((rows, 1 + width * 3), np.uint8)  # filter type 0 (None)
+        scanlines[:, 1:] = pixels[:, : width * 3]
+        return scanlines.tobytes()
+
+
+def _deflate_piece(raw: bytes, last: bool, level: int) -> bytes:
+    # Raw deflate; a full flush ends the piece on a byte boundary with no
+    # back-references into it, so pieces compressed apart concatenate into
+    # one valid stream. Only the last piece ends the stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+
+
+def _write_chunk(f, kind: bytes, data: bytes):
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
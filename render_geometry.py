@@ -0,0 +1,264 @@
+import math
+
+import numpy as np
+
+from geometry_math import Circle, Ellipse, Line, Point, Polyline, nearest_ellipse_param
+
+# What an object looks like once drawn - a line cut to its resize range, a
+# circle or ellipse cut to its draw range - in logical units. Painting,
+# hover and export all work from this, so what can be picked is exactly
+# what is shown (and printed).
+
+# Paper units are millimetres on the sheet, from the drawing origin, y up.
+MM_PER_UNIT = 10
+
+
+class PointGeometry:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: float, y: float):
+        self.x = x
+        self.y = y
+
+
+class LineGeometry:
+    """The visible segment of a Line (its resize range applied)"""
+
+    __slots__ = ("x1", "y1", "x2", "y2")
+
+    def __init__(self, x1: float, y1: float, x2: float, y2: float):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+
+
+class PolylineGeometry:
+    """A polyline's vertices ((n, 2) array) with, for hit testing, its
+    segments as start points and direction vectors"""
+
+    __slots__ = ("vertices", "closed", "starts", "deltas", "lengths2")
+
+    def __init__(self, vertices: np.ndarray, closed: bool):
+        self.vertices = vertices
+        self.closed = closed
+        outline = self.outline()
+        self.starts = outline[:-1]
+        self.deltas = np.diff(outline, axis=0)
+        self.lengths2 = np.einsum("ij,ij->i", self.deltas, self.deltas)
+
+    def outline(self) -> np.ndarray:
+        """The vertices in drawing order, the first repeated at the end if closed"""
+        if self.closed and len(self.vertices) > 2:
+            return np.concatenate((self.vertices, self.vertices[:1]))
+        return self.vertices
+
+
+class ArcGeometry:
+    """A circle or ellipse, or the part of it between start and start + span
+    (degrees; parametric for ellipses, which for circles is the plain
+    angle). span is None for the closed curve."""
+
+    __slots__ = ("cx", "cy", "rx", "ry", "angle", "start", "span")
+
+    def __init__(self, cx, cy, rx, ry, angle=0.0, start=None, span=None):
+        self.cx = cx
+        self.cy = cy
+        self.rx = rx
+        self.ry = ry
+        self.angle = angle
+        self.start = start
+        self.span = span
+
+    @property
+    def is_closed(self) -> bool:
+        return self.span is None
+
+    def point_at(self, degrees: float) -> tuple[float, float]:
+        t = math.radians(degrees)
+        ex = self.rx * math.cos(t)
+        ey = self.ry * math.sin(t)
+        cos_a = math.cos(self.angle)
+        sin_a = math.sin(self.angle)
+        return self.cx + ex * cos_a - ey * sin_a, self.cy + ex * sin_a + ey * cos_a
+
+
+class RenderRecord:
+    """Everything drawing an object needs, worked out once: its geometry in
+    logical and paper units, bounding box (logical: min_x, min_y, max_x,
+    max_y) and pen key (kind, style, type). Kept on the object until it
+    or a point it is built from changes."""
+
+    __slots__ = ("geometry", "paper", "bbox", "pen_key", "deps")
+
+    def __init__(self, geometry, paper, bbox, pen_key, deps):
+        self.geometry = geometry
+        self.paper = paper
+        self.bbox = bbox
+        self.pen_key = pen_key
+        self.deps = deps
+
+
+def record_of(obj) -> RenderRecord | None:
+    """The object's cached render record, rebuilt if it is out of date.
+    None for objects that are not drawn (planes)."""
+    record = getattr(obj, "_render", None)
+    deps = _dependency_revs(obj)
+    if record is not None and record.deps == deps:
+        return record
+    geometry = geometry_of(obj)
+    if geometry is None:
+        return None
+    pen_key = (type(obj).__name__, getattr(obj, "style", None), getattr(obj, "type", None))
+    record = RenderRecord(geometry, _scaled(geometry, MM_PER_UNIT), _bbox(geometry), pen_key, deps)
+    object.__setattr__(obj, "_render", record)
+    return record
+
+
+def _dependency_revs(obj) -> tuple:
+    match obj:
+        case Line():
+            return (obj.p1._rev, obj.p2._rev)
+        case Circle() | Ellipse():
+            return (obj.center._rev,)
+    return ()
+
+
+def _scaled(geometry, factor):
+    match geometry:
+        case PointGeometry():
+            return PointGeometry(geometry.x * factor, geometry.y * factor)
+        case LineGeometry():
+            return LineGeometry(
+                geometry.x1 * factor, geometry.y1 * factor, geometry.x2 * factor, geometry.y2 * factor
+            )
+        case PolylineGeometry():
+            return PolylineGeometry(geometry.vertices * factor, geometry.closed)
+        case ArcGeometry():
+            return ArcGeometry(
+                geometry.cx * factor,
+                geometry.cy * factor,
+                geometry.rx * factor,
+                geometry.ry * factor,
+                geometry.angle,
+                geometry.start,
+                geometry.span,
+            )
+
+
+def _bbox(geometry) -> tuple[float, float, float, float]:
+    match geometry:
+        case PointGeometry():
+            return (geometry.x, geometry.y, geometry.x, geometry.y)
+        case LineGeometry():
+            return (
+                min(geometry.x1, geometry.x2),
+                min(geometry.y1, geometry.y2),
+                max(geometry.x1, geometry.x2),
+                max(geometry.y1, geometry.y2),
+            )
+        case PolylineGeometry():
+            (min_x, min_y), (max_x, max_y) = geometry.vertices.min(axis=0), geometry.vertices.max(axis=0)
+            return (float(min_x), float(min_y), float(max_x), float(max_y))
+        case ArcGeometry():
+            # Of the whole curve; an arc's box can only be smaller
+            cos_a = math.cos(geometry.angle)
+            sin_a = math.sin(geometry.angle)
+            half_w = math.hypot(geometry.rx * cos_a, geometry.ry * sin_a)
+            half_h = math.hypot(geometry.rx * sin_a, geometry.ry * cos_a)
+            return (geometry.cx - half_w, geometry.cy - half_h, geometry.cx + half_w, geometry.cy + half_h)
+
+
+def geometry_of(obj) -> PointGeometry | LineGeometry | PolylineGeometry | ArcGeometry | None:
+    match obj:
+        case Point():
+            return PointGeometry(obj.x, obj.y)
+        case Line():
+            r1, r2 = getattr(obj, "resize", (0.0, 1.0))
+            dx = obj.p2.x - obj.p1.x
+            dy = obj.p2.y - obj.p1.y
+            return LineGeometry(
+                obj.p1.x + r1 * dx, obj.p1.y + r1 * dy, obj.p1.x + r2 * dx, obj.p1.y + r2 * dy
+            )
+        case Circle():
+            start, span = _draw_range(obj)
+            return ArcGeometry(obj.center.x, obj.center.y, obj.radius, obj.radius, 0.0, start, span)
+        case Ellipse():
+            start, span = _draw_range(obj)
+            return ArcGeometry(obj.center.x, obj.center.y, obj.a, obj.b, obj.angle, start, span)
+        case Polyline() if len(obj.vertices):
+            return PolylineGeometry(obj.vertices, obj.closed)
+    return None
+
+
+def _draw_range(obj: Circle | Ellipse) -> tuple[float | None, float | None]:
+    # An empty span (both range points in the same direction) means the
+    # whole curve, as it always has on the canvas.
+    if obj.draw_from is None or not obj.draw_span:
+        return None, None
+    return obj.draw_from, obj.draw_span
+
+
+def distance_to(geometry, px: float, py: float, reach: float = math.inf) -> float:
+    """Distance from (px, py) to the drawn geometry. Anything farther than
+    `reach` may be reported as infinity without being measured exactly."""
+    match geometry:
+        case PointGeometry():
+            return math.hypot(px - geometry.x, py - geometry.y)
+        case LineGeometry():
+            return _dist_point_to_segment(px, py, geometry.x1, geometry.y1, geometry.x2, geometry.y2)
+        case PolylineGeometry():
+            return _dist_point_to_polyline(geometry, px, py)
+        case ArcGeometry():
+            return _dist_point_to_arc(geometry, px, py, reach)
+    return math.inf
+
+
+def _dist_point_to_segment(px, py, x1, y1, x2, y2) -> float:
+    l2 = (x2 - x1) ** 2 + (y2 - y1) ** 2
+    if l2 == 0:
+        return math.hypot(px - x1, py - y1)
+    t = max(0, min(1, ((px - x1) * (x2 - x1) + (py - y1) * (y2 - y1)) / l2))
+    return math.hypot(px - (x1 + t * (x2 - x1)), py - (y1 + t * (y2 - y1)))
+
+
+def _dist_point_to_polyline(polyline: PolylineGeometry, px, py) -> float:
+    # _dist_point_to_segment for all segments at once
+    if not len(polyline.starts):
+        x, y = polyline.vertices[0]
+        return math.hypot(px - x, py - y)
+    rel_x = px - polyline.starts[:, 0]
+    rel_y = py - polyline.starts[:, 1]
+    dx = polyline.deltas[:, 0]
+    dy = polyline.deltas[:, 1]
+    lengths2 = polyline.lengths2
+    t = np.clip((rel_x * dx + rel_y * dy) / np.where(lengths2 == 0, 1, lengths2), 0, 1)
+    return float(np.hypot(rel_x - t * dx, rel_y - t * dy).min())
+
+
+def _dist_point_to_arc(arc: ArcGeometry, px, py, reach) -> float:
+    r = math.hypot(px - arc.cx, py - arc.cy)
+    # The outline lies between the circles of radius min(rx, ry) and
+    # max(rx, ry), so most curves are rejected without solving anything.
+    if r - max(arc.rx, arc.ry) > reach or min(arc.rx, arc.ry) - r > reach:
+        return math.inf
+    if arc.rx == arc.ry:
+        dist = abs(r - arc.rx)
+        t = math.degrees(math.atan2(py - arc.cy, px - arc.cx))
+    else:
+        dx = px - arc.cx
+        dy = py - arc.cy
+        cos_a = math.cos(arc.angle)
+        sin_a = math.sin(arc.angle)
+        lx = dx * cos_a + dy * sin_a
+        ly = -dx * sin_a + dy * cos_a
+        t_rad = nearest_ellipse_param(arc.rx, arc.ry, lx, ly)
+        dist = math.hypot(lx - arc.rx * math.cos(t_rad), ly - arc.ry * math.sin(t_rad))
+        t = math.degrees(t_rad)
+    if arc.is_closed or (t - arc.start) % 360 <= arc.span:
+        return dist
+    # The nearest point is off the arc: the closest visible part is an end
+    return min(
+        math.hypot(px - x, py - y)
+        for x, y in (arc.point_at(arc.start), arc.point_at(arc.start + arc.span))
+    )
@@ -0,0 +1,31 @@
+class SymbolTable:
+    """Dense integer handles for the names scripts use ("A1", "d", ...).
+
+    Scripts keep referring to objects and variables by name, but the
+    project tracks what each statement reads and writes as sets of these
+    handles, so dependency checks compare small ints instead of hashing
+    strings. A handle stays valid for the life of the table."""
+
+    def __init__(self):
+        self._handles: dict[str, int] = {}
+        self._names: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, name: str) -> int:
+        handle = self._handles.get(name)
+        if handle is None:
+            handle = self._handles[name] = len(self._names)
+            self._names.append(name)
+        return handle
+
+    def intern_all(self, names) -> set[int]:
+        return {self.intern(name) for name in names}
+
+    def get(self, name: str) -> int | None:
+        """The handle of name, or None if it was never interned"""
+        return self._handles.get(name)
+
+    def name(self, handle: int) -> str:
+        return self._names[handle]